@@ -1,122 +1,161 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
-from sqlmodel import SQLModel, Session, select, create_engine
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette import status
+from database import engine, get_session
 from tables import User, Article, Tag, Author, ArticleAuthorLink, ArticleTagLink
-from models import ArticleCreate, ArticleDelete, ArticleUpdate, AuthorCreate, TagCreate
-from auth import get_current_user
+from models import ArticleCreate, ArticleDelete, ArticleUpdate, AuthorCreate, AuthorRead, TagCreate, TagRead, ArticleRead, IngestReport, Facets, NameMatch, ExportJobStatus
+from auth import get_current_user, get_current_user_model
+from search import build_match_query, keyword_matches
+from exports import EXPORT_FORMATS, get_encoder, parse_columns, export_response
+from ingest import INGEST_FORMATS, ingest_text
+from cache import response_cache
+from fastjson import FastJSONResponse
+from typeahead import TYPEAHEAD_PAGE_SIZE, TYPEAHEAD_MAX_PAGE_SIZE, normalize_key
+import typeahead
+import export_jobs
+import facets
 from typing import List, Optional
 from starlette import status
-from sqlalchemy import func, or_, and_
-import csv
-from io import StringIO
+from sqlalchemy import func, or_, and_, false, insert, delete
+from sqlalchemy.orm import selectinload
+from datetime import date
+import base64
+import hashlib
+import json
+import os
 
-PAGE_LIMIT = 100
+DEFAULT_PAGE_SIZE = int(os.getenv("ARTICLES_PAGE_SIZE", "100"))
+FACET_LIMIT = int(os.getenv("FACET_LIMIT", "50"))
+MAX_PAGE_SIZE = int(os.getenv("ARTICLES_MAX_PAGE_SIZE", "1000"))
+EXPORT_FORMAT_PATTERN = f"^({'|'.join(EXPORT_FORMATS)})$"
+INGEST_FORMAT_PATTERN = f"^({'|'.join(INGEST_FORMATS)})$"
+EXPORT_JOB_ID_PATTERN = "^[0-9]+-[0-9a-f]{16}$"
+# Ids bound per IN list, below SQLite's limit on query parameters (32766,
+# or 999 before 3.32), so a listing of the whole table still fits.
+ID_CHUNK_SIZE = 500
+ARTICLE_DETAILS = (selectinload(Article.authors), selectinload(Article.tags))
+# The ArticleRead fields that are columns of article.
+ARTICLE_ROW_COLUMNS = (Article.id, Article.title, Article.abstract, Article.publication_date, Article.comment_count)
 
 router = APIRouter(prefix="/articles", 
                     tags=["articles"])
 
-engine = create_engine("sqlite:///./test.db")
-SQLModel.metadata.create_all(engine)
-
-def get_session():
-    with Session(engine) as session:
-        yield session
-
-@router.post("/add_author", response_model=Author)
+@router.post("/add_author", response_model=AuthorRead)
 async def add_author(request: AuthorCreate,
-                     session: Session = Depends(get_session)):
-    author = Author(name=request.name)
+                     session: AsyncSession = Depends(get_session)):
+    author = Author(name=request.name, name_key=normalize_key(request.name))
     session.add(author)
-    session.commit()
+    await session.commit()
+    await response_cache.bump()
+    typeahead.add_name("authors", author.id, author.name)
     return author
 
-@router.get("/get_authors", response_model=List[Author])
-async def get_authors(session: Session = Depends(get_session)):
-    authors = session.exec(select(Author)).all()
-    return authors
+@router.get("/get_authors", response_model=List[AuthorRead])
+async def get_authors(request: Request,
+                      session: AsyncSession = Depends(get_session)):
+    async def build():
+        return [row._asdict() for row in await session.exec(select(Author.id, Author.name).order_by(Author.id))], {}
+    return await response_cache.respond(request, "get_authors", {}, build)
 
-@router.post("/add_tag", response_model=Tag)
+@router.get("/typeahead_authors", response_model=List[NameMatch])
+async def typeahead_authors(prefix: str = Query(..., min_length=1),
+                            page: int = Query(1, ge=1),
+                            page_size: int = Query(TYPEAHEAD_PAGE_SIZE, ge=1, le=TYPEAHEAD_MAX_PAGE_SIZE),
+                            session: AsyncSession = Depends(get_session)):
+    return await typeahead_response("authors", prefix, page, page_size, session)
+
+@router.post("/add_tag", response_model=TagRead)
 async def add_tag(request: TagCreate,
-                  session: Session = Depends(get_session)):
-    tag = Tag(name=request.name)
+                  session: AsyncSession = Depends(get_session)):
+    tag = Tag(name=request.name, name_key=normalize_key(request.name))
     session.add(tag)
-    session.commit()
+    await session.commit()
+    await response_cache.bump()
+    typeahead.add_name("tags", tag.id, tag.name)
     return tag
 
-@router.get("/get_tags", response_model=List[Tag])
-async def get_tags(session: Session = Depends(get_session)):
-    tags = session.exec(select(Tag)).all()
-    return tags
+@router.get("/get_tags", response_model=List[TagRead])
+async def get_tags(request: Request,
+                   session: AsyncSession = Depends(get_session)):
+    async def build():
+        return [row._asdict() for row in await session.exec(select(Tag.id, Tag.name).order_by(Tag.id))], {}
+    return await response_cache.respond(request, "get_tags", {}, build)
+
+@router.get("/typeahead_tags", response_model=List[NameMatch])
+async def typeahead_tags(prefix: str = Query(..., min_length=1),
+                         page: int = Query(1, ge=1),
+                         page_size: int = Query(TYPEAHEAD_PAGE_SIZE, ge=1, le=TYPEAHEAD_MAX_PAGE_SIZE),
+                         session: AsyncSession = Depends(get_session)):
+    return await typeahead_response("tags", prefix, page, page_size, session)
 
 @router.post("/add_article", response_model=Article)
 async def add_article(request: ArticleCreate, 
-                      user: dict = Depends(get_current_user), 
-                      session: Session = Depends(get_session)):
+                      user: User = Depends(get_current_user_model), 
+                      session: AsyncSession = Depends(get_session)):
+    await check_links_exist(request.authors, request.tags, session)
+
     article = Article(title=request.title, 
                       abstract=request.abstract, 
                       publication_date=request.publication_date,
-                      user=session.get(User, user["id"]))
-    
-    for author_id in request.authors:
-        author = session.get(Author, author_id)
-        if not author:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                                detail=f"Author with id: {author_id} was not found.")
-        article.authors.append(author)
-
-    for tag_id in request.tags:
-        tag = session.get(Tag, tag_id)
-        if not tag:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                                detail=f"Tag with id: {tag_id} was not found.")
-        article.tags.append(tag)
-
+                      user=user)
     session.add(article)
-    session.commit()
+    await session.flush()
+    await update_links(ArticleAuthorLink, "author_id", article.id, request.authors, session, new=True)
+    await update_links(ArticleTagLink, "tag_id", article.id, request.tags, session, new=True)
+    await session.commit()
+    await response_cache.bump(articles=True)
     return article
 
+@router.post("/bulk_add_articles", response_model=IngestReport)
+async def bulk_add_articles(request: Request,
+                            ingest_format: str = Query("ndjson", alias="format", pattern=INGEST_FORMAT_PATTERN),
+                            user: dict = Depends(get_current_user)):
+    try:
+        body = (await request.body()).decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="The request body must be UTF-8 encoded.")
+    # Parsing, validation and the chunked inserts run on the sync engine in
+    # the threadpool, the same way the streamed exports do.
+    report = await run_in_threadpool(ingest_text, engine, body, ingest_format, user["id"])
+    if report["inserted"]:
+        await response_cache.bump(articles=True)
+    return report
+
 @router.put("/update_article", response_model=Article)
 async def update_article(request: ArticleUpdate,
                          user: dict = Depends(get_current_user), 
-                         session: Session = Depends(get_session)):
-    article = session.get(Article, request.article_id)
+                         session: AsyncSession = Depends(get_session)):
+    article = await session.get(Article, request.article_id,
+                                options=[selectinload(Article.user)])
     if not article:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Article not found.")
     if article.user.id != user["id"]:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Unauthoriazed action.")
+    await check_links_exist(request.authors, request.tags, session)
     
     article.title = request.title
     article.abstract = request.abstract
     article.publication_date = request.publication_date
-
-    updated_authors = []
-    for author_id in request.authors:
-        author = session.get(Author, author_id)
-        if not author:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                                detail=f"Author with id: {author_id} was not found.")
-        updated_authors.append(author)
-    article.authors = updated_authors
-
-    updated_tags = []
-    for tag_id in request.tags:
-        tag = session.get(Tag, tag_id)
-        if not tag:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                                detail=f"Tag with id: {tag_id} was not found.")
-        updated_tags.append(tag)
-    article.tags = updated_tags
-    session.commit()
+    await update_links(ArticleAuthorLink, "author_id", article.id, request.authors, session)
+    await update_links(ArticleTagLink, "tag_id", article.id, request.tags, session)
+    await session.commit()
+    await response_cache.bump(articles=True)
 
     return article
 
 @router.delete("/delete_article", status_code=204)
 async def delete_article(request: ArticleDelete,
                          user: dict = Depends(get_current_user), 
-                         session: Session = Depends(get_session)):
-    article = article = session.get(Article, request.article_id)
+                         session: AsyncSession = Depends(get_session)):
+    # Deleting needs every link collection loaded, lazy loads can't run here.
+    article = await session.get(Article, request.article_id,
+                                options=[selectinload(Article.user), selectinload(Article.comments), *ARTICLE_DETAILS])
     if not article:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Article not.")
@@ -124,89 +163,309 @@ async def delete_article(request: ArticleDelete,
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Unauthoriazed action.")
     
-    session.delete(article)
-    session.commit()
+    await session.delete(article)
+    await session.commit()
+    await response_cache.bump(articles=True)
     return {"message": "User deleted successfuly"}
 
-@router.get("/get_all_articles", response_model=List[Article])
-async def get_all_articles(session: Session = Depends(get_session)):
-    articles = session.exec(select(Article)).all()
-    return articles
+@router.get("/get_all_articles", response_model=List[ArticleRead])
+async def get_all_articles(request: Request,
+                           session: AsyncSession = Depends(get_session)):
+    async def build():
+        return await read_articles(select(*ARTICLE_ROW_COLUMNS), session), {}
+    return await response_cache.respond(request, "get_all_articles", {}, build)
 
-@router.get("/get_filtered_articles", response_model=List[Article])
-async def get_filtered_articles(year: Optional[str] = None, 
+@router.get("/get_filtered_articles", response_model=List[ArticleRead])
+async def get_filtered_articles(request: Request,
+                                year: Optional[str] = None, 
                                 month: Optional[str] = None, 
                                 authors: Optional[str] = None,
                                 tags: Optional[str] = None,
                                 keywords: Optional[str] = None,
                                 page: int = Query(1, ge=1),
-                                session: Session = Depends(get_session)):
-    fitlered_articles = get_filtered_articles(year, month, authors, tags, keywords, session, page)
-    return fitlered_articles
+                                page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                cursor: Optional[str] = None,
+                                date_from: Optional[date] = None,
+                                date_to: Optional[date] = None,
+                                rank: bool = False,
+                                session: AsyncSession = Depends(get_session)):
+    if cursor and rank:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Cursor pagination can't be combined with rank.")
+    async def build():
+        fitlered_articles = await get_filtered_articles(year, month, authors, tags, keywords, session, page, rank,
+                                                        date_from=date_from, date_to=date_to,
+                                                        page_size=page_size, cursor=cursor)
+        headers = {}
+        if len(fitlered_articles) == page_size and not rank:
+            headers["X-Next-Cursor"] = encode_cursor(fitlered_articles[-1])
+        return fitlered_articles, headers
+    # Equivalent filters written differently share one cache entry.
+    params = {"year": year,
+              "month": month,
+              "authors": normalize_names(authors),
+              "tags": normalize_names(tags),
+              "keywords": normalize_names(keywords),
+              "page": None if cursor else page,
+              "page_size": page_size,
+              "cursor": cursor,
+              "date_from": date_from,
+              "date_to": date_to,
+              "rank": rank}
+    return await response_cache.respond(request, "get_filtered_articles", params, build)
+
+@router.get("/get_facets", response_model=Facets)
+async def get_facets(request: Request,
+                     year: Optional[str] = None, 
+                     month: Optional[str] = None, 
+                     authors: Optional[str] = None,
+                     tags: Optional[str] = None,
+                     keywords: Optional[str] = None,
+                     date_from: Optional[date] = None,
+                     date_to: Optional[date] = None,
+                     limit: int = Query(FACET_LIMIT, ge=1),
+                     session: AsyncSession = Depends(get_session)):
+    async def build():
+        if facets.summary_enabled and not any((year, month, authors, tags, keywords, date_from, date_to)):
+            statement = facets.summary_counts_statement(limit)
+        else:
+            filtered = await filtered_articles_statement(year, month, authors, tags, keywords, session,
+                                                         date_from=date_from, date_to=date_to)
+            statement = facets.facet_counts_statement(filtered, limit)
+        rows = (await session.exec(statement)).all()
+        return facets.group_facets(rows, limit), {}
+    params = {"year": year,
+              "month": month,
+              "authors": normalize_names(authors),
+              "tags": normalize_names(tags),
+              "keywords": normalize_names(keywords),
+              "date_from": date_from,
+              "date_to": date_to,
+              "limit": limit}
+    return await response_cache.respond(request, "get_facets", params, build)
 
-@router.get("/download_filtered_articles", response_class=Response)
+@router.get("/download_filtered_articles", response_class=StreamingResponse)
 async def download_filtered_articles(year: Optional[str] = None, 
                                      month: Optional[str] = None, 
                                      authors: Optional[str] = None,
                                      tags: Optional[str] = None,
                                      keywords: Optional[str] = None,
-                                     session: Session = Depends(get_session)):
-    articles = get_filtered_articles(year, month, authors, tags, keywords, session)
-    if not articles:
+                                     date_from: Optional[date] = None,
+                                     date_to: Optional[date] = None,
+                                     columns: Optional[str] = None,
+                                     export_format: str = Query("csv", alias="format", pattern=EXPORT_FORMAT_PATTERN),
+                                     compression: Optional[str] = Query(None, pattern="^gzip$"),
+                                     session: AsyncSession = Depends(get_session)):
+    columns = parse_columns(columns)
+    statement = await filtered_articles_statement(year, month, authors, tags, keywords, session,
+                                                  date_from=date_from, date_to=date_to)
+    if not (await session.exec(statement.limit(1))).first():
         raise HTTPException(status_code=404, detail="No articles found")
-    
-    stream = StringIO()
-    csv_writer = csv.writer(stream)
-    csv_writer.writerow(['id', 'title', 'abstract'])
+    return export_response(engine, statement, columns, export_format, compression)
 
-    for article in articles:
-        csv_writer.writerow([article.id, article.title, article.abstract])
-    
-    stream.seek(0)
-    headers = {
-        'Content-Disposition': 'attachment; filename="articles.csv"'
-    }
+@router.post("/submit_export", response_model=ExportJobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_export(year: Optional[str] = None, 
+                        month: Optional[str] = None, 
+                        authors: Optional[str] = None,
+                        tags: Optional[str] = None,
+                        keywords: Optional[str] = None,
+                        date_from: Optional[date] = None,
+                        date_to: Optional[date] = None,
+                        columns: Optional[str] = None,
+                        export_format: str = Query("csv", alias="format", pattern=EXPORT_FORMAT_PATTERN),
+                        compression: Optional[str] = Query(None, pattern="^gzip$"),
+                        session: AsyncSession = Depends(get_session)):
+    # Same filters as download_filtered_articles, written to a file by a
+    # background job. Poll get_export, then fetch the file from download_export.
+    columns = parse_columns(columns)
+    get_encoder(export_format, columns)
+    statement = await filtered_articles_statement(year, month, authors, tags, keywords, session,
+                                                  date_from=date_from, date_to=date_to)
+    params = {"year": year,
+              "month": month,
+              "authors": normalize_names(authors),
+              "tags": normalize_names(tags),
+              "keywords": normalize_names(keywords),
+              "date_from": date_from,
+              "date_to": date_to,
+              "columns": columns,
+              "format": export_format,
+              "compression": compression}
+    version = await response_cache.version("articles")
+    key_hash = hashlib.sha1(response_cache.make_key("export", params).encode()).hexdigest()[:16]
+    job = await run_in_threadpool(export_jobs.submit, engine, export_jobs.make_job_id(version, key_hash),
+                                  statement, columns, export_format, compression, response_cache.shared)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Too many exports are waiting, try again later.")
+    return await run_in_threadpool(job.read, version)
 
-    return Response(content=stream.getvalue(), media_type="text/csv", headers=headers)
+@router.get("/get_export", response_model=ExportJobStatus)
+async def get_export(job_id: str = Query(..., pattern=EXPORT_JOB_ID_PATTERN)):
+    job = await run_in_threadpool(export_jobs.get_job, job_id, response_cache.shared)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Export not found.")
+    return await run_in_threadpool(job.read, await response_cache.version("articles"))
 
-@router.get("/download_articles", response_class=Response)
-async def download_filtered_articles(article_ids: Optional[str] = None, 
-                                     session: Session = Depends(get_session)):
-    
-    article_ids = [int(aritcle_id.strip()) for aritcle_id in article_ids.split(",")]
+@router.get("/download_export", response_class=FileResponse)
+async def download_export(job_id: str = Query(..., pattern=EXPORT_JOB_ID_PATTERN)):
+    job = await run_in_threadpool(export_jobs.get_job, job_id, response_cache.shared)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Export not found.")
+    job_status = (await run_in_threadpool(job.read, await response_cache.version("articles")))["status"]
+    if job_status == "expired":
+        raise HTTPException(status_code=status.HTTP_410_GONE,
+                            detail="The articles changed since this export was submitted, submit it again.")
+    if job_status != "done":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail=f"The export is {job_status}.")
+    return FileResponse(job.path, media_type=job.media_type, filename=f"articles.{job.extension}")
 
-    statement = select(Article).where(Article.id.in_(article_ids))
-    articles = session.exec(statement).all()
+@router.get("/download_articles", response_class=StreamingResponse)
+async def download_articles(article_ids: Optional[str] = None, 
+                            columns: Optional[str] = None,
+                            export_format: str = Query("csv", alias="format", pattern=EXPORT_FORMAT_PATTERN),
+                            compression: Optional[str] = Query(None, pattern="^gzip$"),
+                            session: AsyncSession = Depends(get_session)):
+    try:
+        article_ids = [int(aritcle_id.strip()) for aritcle_id in article_ids.split(",")]
+    except (AttributeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Invalid article ids.")
+    columns = parse_columns(columns)
 
-    if not articles:
+    statement = select(Article).where(Article.id.in_(article_ids)).order_by(Article.id)
+    if not (await session.exec(statement.limit(1))).first():
         raise HTTPException(status_code=404, detail="No articles found")
-    
-    stream = StringIO()
-    csv_writer = csv.writer(stream)
-    csv_writer.writerow(['id', 'title', 'abstract'])
+    return export_response(engine, statement, columns, export_format, compression)
 
-    for article in articles:
-        csv_writer.writerow([article.id, article.title, article.abstract])
-    
-    stream.seek(0)
-    headers = {
-        'Content-Disposition': 'attachment; filename="articles.csv"'
-    }
-
-    return Response(content=stream.getvalue(), media_type="text/csv", headers=headers)
-
-def get_filtered_articles(year: str, 
-                          month:str, 
-                          authors:str, 
-                          tags:str,
-                          keywords: str, 
-                          session: Session,
-                          page: int = None) -> List[Article]:
-    statement = select(Article)
-    if year: 
-        statement = statement.where(func.strftime('%Y', Article.publication_date) == year)
-    if month:
-        statement = statement.where(func.strftime('%m', Article.publication_date) == month)
+async def typeahead_response(facet: str, prefix: str, page: int, page_size: int, session: AsyncSession) -> FastJSONResponse:
+    # Case-insensitive prefix matches, most used first.
+    if not normalize_key(prefix):
+        # Whitespace alone would match, and rank, every name.
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="The prefix must contain more than whitespace.")
+    matches = await typeahead.search_names(facet, prefix, (page - 1) * page_size, page_size, session)
+    headers = {}
+    if len(matches) == page_size:
+        headers["X-Next-Page"] = str(page + 1)
+    return FastJSONResponse(matches, headers=headers)
+
+async def missing_ids(model, ids: List[int], session: AsyncSession) -> List[int]:
+    if not ids:
+        return []
+    found = set((await session.exec(select(model.id).where(model.id.in_(set(ids))))).all())
+    return sorted(set(ids) - found)
+
+async def check_links_exist(author_ids: List[int], tag_ids: List[int], session: AsyncSession):
+    # One IN query per entity type, and every missing id in a single 404.
+    missing_authors = await missing_ids(Author, author_ids, session)
+    missing_tags = await missing_ids(Tag, tag_ids, session)
+    details = []
+    if missing_authors:
+        details.append(f"Authors with ids: {', '.join(map(str, missing_authors))} were not found.")
+    if missing_tags:
+        details.append(f"Tags with ids: {', '.join(map(str, missing_tags))} were not found.")
+    if details:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=" ".join(details))
+
+async def update_links(link_model, key: str, article_id: int, ids: List[int], session: AsyncSession, new: bool = False):
+    # Writes only the difference between the stored and requested link rows,
+    # with a single DELETE and a single executemany INSERT.
+    column = getattr(link_model, key)
+    wanted = set(ids)
+    current = set()
+    if not new:
+        current = set((await session.exec(select(column).where(link_model.article_id == article_id))).all())
+    removed = current - wanted
+    added = wanted - current
+    if removed:
+        await session.exec(delete(link_model).where(link_model.article_id == article_id, column.in_(removed)))
+    if added:
+        await session.exec(insert(link_model), params=[{"article_id": article_id, key: linked_id} for linked_id in sorted(added)])
+
+def parse_date_part(value: str, name: str, maximum: int) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if not 1 <= number <= maximum:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Invalid {name}: {value}.")
+    return number
+
+def month_range(year: int, month: int):
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return and_(Article.publication_date >= start, Article.publication_date < end)
+
+async def publication_date_conditions(year: str,
+                                      month: str,
+                                      date_from: date,
+                                      date_to: date,
+                                      session: AsyncSession) -> list:
+    # Half-open ranges on the bare column instead of strftime() so the
+    # publication_date index can be used.
+    conditions = []
+    year = parse_date_part(year, "year", 9998) if year else None
+    month = parse_date_part(month, "month", 12) if month else None
+    if year and month:
+        conditions.append(month_range(year, month))
+    elif year:
+        conditions.append(and_(Article.publication_date >= date(year, 1, 1),
+                               Article.publication_date < date(year + 1, 1, 1)))
+    elif month:
+        # A month without a year becomes one range per year in the table;
+        # min/max on the indexed column are single index lookups.
+        first, last = (await session.exec(select(func.min(Article.publication_date),
+                                                 func.max(Article.publication_date)))).one()
+        if first is None:
+            conditions.append(false())
+        else:
+            conditions.append(or_(*[month_range(y, month) for y in range(first.year, last.year + 1)]))
+    if date_from:
+        conditions.append(Article.publication_date >= date_from)
+    if date_to:
+        conditions.append(Article.publication_date <= date_to)
+    return conditions
+
+async def get_filtered_articles(year: str, 
+                                month:str, 
+                                authors:str, 
+                                tags:str,
+                                keywords: str, 
+                                session: AsyncSession,
+                                page: int = None,
+                                rank: bool = False,
+                                date_from: date = None,
+                                date_to: date = None,
+                                page_size: int = DEFAULT_PAGE_SIZE,
+                                cursor: str = None) -> List[dict]:
+    statement = await filtered_articles_statement(year, month, authors, tags, keywords, session, rank,
+                                                  date_from=date_from, date_to=date_to,
+                                                  columns=ARTICLE_ROW_COLUMNS)
+    if cursor:
+        statement = statement.where(after_cursor(cursor)).limit(page_size)
+    elif page:
+        statement = statement.offset((page - 1) * page_size).limit(page_size)
+    return await read_articles(statement, session)
+
+async def filtered_articles_statement(year: str, 
+                                      month: str, 
+                                      authors: str, 
+                                      tags: str,
+                                      keywords: str, 
+                                      session: AsyncSession,
+                                      rank: bool = False,
+                                      date_from: date = None,
+                                      date_to: date = None,
+                                      columns: tuple = None):
+    statement = select(*columns) if columns else select(Article)
+    for condition in await publication_date_conditions(year, month, date_from, date_to, session):
+        statement = statement.where(condition)
     if authors:
         authors = set([author.strip() for author in authors.split(",")])
         statement = statement\
@@ -223,19 +482,78 @@ def get_filtered_articles(year: str,
                         .where(Tag.name.in_(tags))\
                         .group_by(Article.id)\
                         .having(func.count(func.distinct(Tag.name)) == len(tags))
+    ranked = False
     if keywords:
         keywords = [keyword.strip() for keyword in keywords.split(",")]
+        match_query = build_match_query(keywords)
+        if match_query:
+            matches = keyword_matches(match_query)
+            statement = statement.join(matches, matches.c.article_id == Article.id)
+            if rank:
+                statement = statement.order_by(matches.c.rank, Article.id)
+                ranked = True
+        # The FTS index narrows the candidates, the ilike conditions keep the exact substring semantics.
         or_conditions = [Article.title.ilike(f"%{keyword}%") | Article.abstract.ilike(f"%{keyword}%") for keyword in keywords]
         statement = statement.where(and_(*or_conditions))
+    if not ranked:
+        statement = statement.order_by(Article.publication_date, Article.id)
+    return statement
+
+def normalize_names(names: str) -> List[str]:
+    if not names:
+        return []
+    return sorted(set(name.strip() for name in names.split(",")))
+
+def encode_cursor(article: dict) -> str:
+    publication_date = article["publication_date"].isoformat() if article["publication_date"] else None
+    return base64.urlsafe_b64encode(json.dumps([publication_date, article["id"]]).encode()).decode()
+
+def after_cursor(cursor: str):
+    # Keyset condition for "(publication_date, id) > cursor". SQLite sorts
+    # NULL dates first, so a NULL cursor date continues through the NULLs.
+    try:
+        publication_date, article_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        publication_date = date.fromisoformat(publication_date) if publication_date else None
+        article_id = int(article_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Invalid cursor.")
+    if publication_date is None:
+        return or_(and_(Article.publication_date.is_(None), Article.id > article_id),
+                   Article.publication_date.is_not(None))
+    return or_(Article.publication_date > publication_date,
+               and_(Article.publication_date == publication_date, Article.id > article_id))
 
-    if not page:
-        articles = session.exec(statement).all()
-    else:
-        articles = session.exec(statement.offset((page - 1) * PAGE_LIMIT).limit(PAGE_LIMIT)).all()
+async def linked_names(link_model, name_model, key: str, article_ids: List[int], session: AsyncSession) -> dict:
+    names = {}
+    for start in range(0, len(article_ids), ID_CHUNK_SIZE):
+        statement = select(link_model.article_id, name_model.id, name_model.name)\
+                        .join(name_model, name_model.id == getattr(link_model, key))\
+                        .where(link_model.article_id.in_(article_ids[start:start + ID_CHUNK_SIZE]))\
+                        .order_by(link_model.article_id, name_model.id)
+        for article_id, name_id, name in await session.exec(statement):
+            names.setdefault(article_id, []).append({"id": name_id, "name": name})
+    return names
 
-    for art in articles:
-        print(art.authors, art.tags)
-    return articles
+async def read_articles(statement, session: AsyncSession) -> List[dict]:
+    # ArticleRead shaped dicts from a select of ARTICLE_ROW_COLUMNS plus one
+    # query each for authors and tags per ID_CHUNK_SIZE articles. No ORM
+    # objects are built and the cached response body is encoded from the
+    # dicts directly.
+    rows = (await session.exec(statement)).all()
+    if not rows:
+        return []
+    article_ids = [row.id for row in rows]
+    authors = await linked_names(ArticleAuthorLink, Author, "author_id", article_ids, session)
+    tags = await linked_names(ArticleTagLink, Tag, "tag_id", article_ids, session)
+    return [{"id": row.id,
+             "title": row.title,
+             "abstract": row.abstract,
+             "publication_date": row.publication_date,
+             "authors": authors.get(row.id, []),
+             "tags": tags.get(row.id, []),
+             "comment_count": row.comment_count}
+            for row in rows]
 
 # na kanw to read me
 # gia to readme na valw requirements txt me ta modules kai na pw na trekseis to main na pas sto swagger kai na dokimaseis a APIs
@@ -3,10 +3,19 @@ from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlmodel import SQLModel, Session, select, create_engine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette import status
+from database import get_session
 from tables import User
 from models import CreateUserRequest, Token
+from cache import TTLCache, response_cache
+from sqlalchemy.orm import make_transient_to_detached
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import os
+import time
 
 router = APIRouter(prefix="/auth", 
                     tags=["auth"])
@@ -15,53 +24,84 @@ router = APIRouter(prefix="/auth",
 SECRET_KEY = "1232341235123451234514325aaeqw1234312"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
 
-engine = create_engine("sqlite:///./test.db")
-SQLModel.metadata.create_all(engine)
-
-def get_session():
-    with Session(engine) as session:
-        yield session
-
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning the rounds makes verify_and_update() report hashes made with any
+# other cost, so they are rehashed on the next successful login.
+bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the
+# event loop while bounding how many CPU-heavy hashes run at once.
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
 
+# Verified token payloads keyed by the token's SHA-256, and detached User
+# snapshots keyed by id for handlers that need the row itself.
+token_cache = TTLCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_user(create_user_request: CreateUserRequest, 
-                      session: Session = Depends(get_session)):
+                      session: AsyncSession = Depends(get_session)):
     
     create_user_model = User(username=create_user_request.username,
-                             hashed_password=bcrypt_context.hash(create_user_request.password),
+                             hashed_password=await hash_password(create_user_request.password),
                              )
 
     session.add(create_user_model)
-    session.commit()
+    await session.commit()
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(),
-                                 session: Session = Depends(get_session)):
-    user = authenticate_user(form_data.username, form_data.password, session)
+                                 session: AsyncSession = Depends(get_session)):
+    user = await authenticate_user(form_data.username, form_data.password, session)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Could not validate user.")
     token = create_access_token(user.username, user.id, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     return {"access_token": token, "token_type": "bearer"}
 
-def authenticate_user(username: str, password: str, session: Session) -> bool|User:
+async def authenticate_user(username: str, password: str, session: AsyncSession) -> bool|User:
     statement = select(User).where(User.username == username)
-    user = session.exec(statement).one()
+    user = (await session.exec(statement)).first()
     if not user:
         return False
-    if not bcrypt_context.verify(password, user.hashed_password):
+    verified, new_hash = await verify_password(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash:
+        user.hashed_password = new_hash
+        await session.commit()
+        user_cache.pop(user.id)
     return user
 
+async def run_password_task(function, *args):
+    return await asyncio.get_running_loop().run_in_executor(password_executor, function, *args)
+
+async def hash_password(password: str) -> str:
+    return await run_password_task(bcrypt_context.hash, password)
+
+async def verify_password(password: str, hashed_password: str) -> tuple:
+    try:
+        return await run_password_task(bcrypt_context.verify_and_update, password, hashed_password)
+    except ValueError:
+        # Not a hash this context knows, e.g. a plain text sample password.
+        return False, None
+
 def create_access_token(username: str, user_id: int, expires_delta: timedelta):
     expires = datetime.now() + expires_delta
     encode = {"sub": username, "id": user_id, "exp": expires}
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
  
 async def get_current_user(token: str = Depends(oauth2_bearer)):
+    token_key = hashlib.sha256(token.encode()).hexdigest()
+    cached = token_cache.get(token_key)
+    if cached is not None:
+        return dict(cached)
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -69,7 +109,30 @@ async def get_current_user(token: str = Depends(oauth2_bearer)):
         if username is None or user_id is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                                 detail="Could not validate user.")
-        return {"username": username, "id": user_id}
+        user = {"username": username, "id": user_id}
+        # Never outlive the token itself: a cached entry is dropped by its exp.
+        token_cache.set(token_key, user, ttl=payload["exp"] - time.time())
+        return dict(user)
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Could not validate user.")
+
+async def get_current_user_model(user: dict = Depends(get_current_user),
+                                 session: AsyncSession = Depends(get_session)) -> User:
+    snapshot = user_cache.get(user["id"])
+    if snapshot is None:
+        db_user = await session.get(User, user["id"])
+        if not db_user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                detail="Could not validate user.")
+        snapshot = User(id=db_user.id, username=db_user.username, hashed_password=db_user.hashed_password)
+        make_transient_to_detached(snapshot)
+        user_cache.set(user["id"], snapshot)
+    # merge(load=False) attaches a copy of the snapshot without a SELECT.
+    return await session.merge(snapshot, load=False)
+
+@router.get("/cache_stats")
+async def cache_stats():
+    return {"token_cache": token_cache.stats(),
+            "user_cache": user_cache.stats(),
+            "response_cache": response_cache.stats()}
@@ -0,0 +1,85 @@
+# Load test for /auth/token: throughput and tail latency of logins with the
+# bcrypt work offloaded to auth.password_executor, compared with hashing
+# inline on the event loop.
+#
+#   BCRYPT_ROUNDS=10 python -m benchmarks.auth_token --requests 200 --concurrency 16
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import httpx
+
+async def run_logins(client: httpx.AsyncClient, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    ping_latencies = []
+    done = asyncio.Event()
+
+    async def login():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/auth/token", data={"username": "bench", "password": "bench-password"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await client.get("/articles/get_tags")
+            ping_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.01)
+
+    prober = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*[login() for _ in range(requests)])
+    elapsed = time.perf_counter() - started
+    done.set()
+    await prober
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {"rps": requests / elapsed,
+            "p50": percentiles[49] * 1000,
+            "p95": percentiles[94] * 1000,
+            "p99": percentiles[98] * 1000,
+            "other_max": max(ping_latencies) * 1000 if ping_latencies else 0.0}
+
+async def benchmark(args):
+    import auth
+    from database import engine
+    from schema import create_schema
+    from main import app
+    from benchmarks.server import running_server
+
+    async def run_inline(function, *args):
+        return function(*args)
+
+    create_schema(engine)
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with running_server(app) as base_url, \
+               httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        response = await client.post("/auth/", json={"username": "bench", "password": "bench-password"})
+        response.raise_for_status()
+        offloaded = auth.run_password_task
+        print(f"bcrypt rounds {auth.BCRYPT_ROUNDS}, {auth.PASSWORD_HASH_WORKERS} hashing threads")
+        for name, runner in (("inline", run_inline), ("offloaded", offloaded)):
+            auth.run_password_task = runner
+            result = await run_logins(client, args.requests, args.concurrency)
+            print(f"{name:10} {result['rps']:7.1f} logins/s  p50 {result['p50']:7.1f} ms  "
+                  f"p95 {result['p95']:7.1f} ms  p99 {result['p99']:7.1f} ms  "
+                  f"max concurrent /get_tags {result['other_max']:7.1f} ms")
+        auth.run_password_task = offloaded
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        # Must be set before the application modules create their engines.
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        asyncio.run(benchmark(args))
+
+if __name__ == "__main__":
+    main()
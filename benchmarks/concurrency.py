@@ -0,0 +1,118 @@
+# Compares a handler that runs synchronous Session calls inside "async def"
+# (the old pattern) with the AsyncSession path, under parallel load. Besides
+# requests per second it reports the latency of a trivial /ping endpoint
+# served while the load runs, which shows how long the event loop is blocked.
+#
+#   python -m benchmarks.concurrency --articles 20000 --concurrency 32
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+import httpx
+from fastapi import FastAPI
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import insert
+from database import make_engine, make_async_engine
+from schema import create_schema
+from tables import Article
+from benchmarks.server import running_server
+
+def populate(engine, count: int):
+    start = date(2000, 1, 1)
+    rows = [{"title": f"Article {i}",
+             "abstract": f"Abstract of article {i} " * 5,
+             "publication_date": start + timedelta(days=i % 9000)}
+            for i in range(count)]
+    with Session(engine) as session:
+        session.execute(insert(Article), rows)
+        session.commit()
+
+def build_app(engine, async_engine, page_size: int) -> FastAPI:
+    app = FastAPI()
+    # A LIKE filter can't use an index, so each request keeps SQLite busy.
+    statement = select(Article)\
+                    .where(Article.abstract.like("%article 9%"))\
+                    .order_by(Article.publication_date, Article.id)\
+                    .limit(page_size)
+
+    @app.get("/blocking")
+    async def blocking():
+        with Session(engine) as session:
+            return [article.model_dump() for article in session.exec(statement).all()]
+
+    @app.get("/async")
+    async def non_blocking():
+        async with AsyncSession(async_engine) as session:
+            return [article.model_dump() for article in (await session.exec(statement)).all()]
+
+    @app.get("/ping")
+    async def ping():
+        return {}
+
+    return app
+
+async def run_load(client: httpx.AsyncClient, path: str, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    ping_latencies = []
+    done = asyncio.Event()
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await client.get("/ping")
+            ping_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.005)
+
+    prober = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    elapsed = time.perf_counter() - started
+    done.set()
+    await prober
+    return {"rps": requests / elapsed,
+            "p50": statistics.median(latencies) * 1000,
+            "p95": statistics.quantiles(latencies, n=20)[-1] * 1000,
+            "ping_max": max(ping_latencies) * 1000 if ping_latencies else 0.0}
+
+async def benchmark(args):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        engine = make_engine(f"sqlite:///{path}")
+        create_schema(engine)
+        populate(engine, args.articles)
+        async_engine = make_async_engine(f"sqlite+aiosqlite:///{path}")
+        app = build_app(engine, async_engine, args.page_size)
+
+        limits = httpx.Limits(max_connections=args.concurrency + 1)
+        async with running_server(app) as base_url, \
+                   httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            for path in ("/blocking", "/async"):
+                await run_load(client, path, args.concurrency, args.concurrency)
+                result = await run_load(client, path, args.requests, args.concurrency)
+                print(f"{path:10} {result['rps']:8.1f} req/s  p50 {result['p50']:7.1f} ms  "
+                      f"p95 {result['p95']:7.1f} ms  max /ping {result['ping_max']:7.1f} ms")
+        await async_engine.dispose()
+        engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--page-size", type=int, default=100)
+    asyncio.run(benchmark(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
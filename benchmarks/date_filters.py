@@ -0,0 +1,84 @@
+# Compares the old strftime() year/month filters with the sargable range
+# predicates used by get_filtered_articles.
+#
+#   python -m benchmarks.date_filters --articles 200000
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import func, insert, text
+from database import make_engine, make_async_engine
+from schema import create_schema
+from tables import Article
+from articles import publication_date_conditions
+
+def populate(engine, count: int, seed: int):
+    random.seed(seed)
+    start = date(2000, 1, 1)
+    rows = [{"title": f"Article {i}",
+             "abstract": f"Abstract of article {i}",
+             "publication_date": start + timedelta(days=random.randrange(365 * 25))}
+            for i in range(count)]
+    with Session(engine) as session:
+        session.execute(insert(Article), rows)
+        session.commit()
+
+async def range_conditions(async_engine, year: str, month: str) -> list:
+    async with AsyncSession(async_engine) as session:
+        return await publication_date_conditions(year, month, None, None, session)
+
+def explain(session: Session, statement) -> str:
+    compiled = statement.compile(session.get_bind(), compile_kwargs={"literal_binds": True})
+    plan = session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return "; ".join(row[-1] for row in plan)
+
+def timed(session: Session, statement, repeat: int) -> tuple:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        rows = session.exec(statement).all()
+    return (time.perf_counter() - started) / repeat * 1000, len(rows)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        engine = make_engine(f"sqlite:///{path}")
+        async_engine = make_async_engine(f"sqlite+aiosqlite:///{path}")
+        create_schema(engine)
+        populate(engine, args.articles, args.seed)
+
+        cases = [("year=2010", "2010", None),
+                 ("year=2010&month=06", "2010", "06"),
+                 ("month=06", None, "06")]
+        with Session(engine) as session:
+            for name, year, month in cases:
+                old = select(Article)
+                if year:
+                    old = old.where(func.strftime('%Y', Article.publication_date) == year)
+                if month:
+                    old = old.where(func.strftime('%m', Article.publication_date) == month)
+                new = select(Article)
+                for condition in asyncio.run(range_conditions(async_engine, year, month)):
+                    new = new.where(condition)
+
+                old_ms, old_rows = timed(session, old, args.repeat)
+                new_ms, new_rows = timed(session, new, args.repeat)
+                assert old_rows == new_rows, (name, old_rows, new_rows)
+                print(f"{name} ({new_rows} rows)")
+                print(f"  strftime: {old_ms:8.2f} ms  plan: {explain(session, old)}")
+                print(f"  range:    {new_ms:8.2f} ms  plan: {explain(session, new)}")
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
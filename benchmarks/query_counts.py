@@ -0,0 +1,98 @@
+# Checks that the article listing endpoints run a constant number of SQL
+# statements per request, whatever the number of articles on the page.
+#
+#   python -m benchmarks.query_counts
+import asyncio
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from database import make_engine, make_async_engine
+from schema import create_schema
+from tables import Article, Author, Tag, Comment
+import database
+from cache import response_cache
+from main import app
+
+ENDPOINTS = ["/articles/get_all_articles",
+             "/articles/get_filtered_articles",
+             "/articles/get_filtered_articles?year=2023&tags=Tag 0",
+             "/articles/get_filtered_articles?authors=Author 0&keywords=article"]
+
+def populate(engine, count: int):
+    with Session(engine) as session:
+        authors = [Author(name=f"Author {i}") for i in range(3)]
+        tags = [Tag(name=f"Tag {i}") for i in range(3)]
+        for i in range(count):
+            article = Article(title=f"Article {i}",
+                              abstract=f"Abstract of article {i}",
+                              publication_date=date(2023, 1 + i % 12, 1),
+                              authors=authors,
+                              tags=tags)
+            article.comments = [Comment(content=f"Comment {j}") for j in range(i % 3)]
+            article.comment_count = len(article.comments)
+            session.add(article)
+        session.commit()
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+def statement_counts(directory: str, count: int) -> dict:
+    path = os.path.join(directory, f'bench_{count}.db')
+    engine = make_engine(f"sqlite:///{path}")
+    create_schema(engine)
+    populate(engine, count)
+    async_engine = make_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    async def get_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[database.get_session] = get_session
+    # Responses cached for the previous database must not be served here.
+    asyncio.run(response_cache.bump())
+    client = TestClient(app)
+    counts = {}
+    for endpoint in ENDPOINTS:
+        with count_statements(async_engine.sync_engine) as statements:
+            response = client.get(endpoint)
+        response.raise_for_status()
+        counts[endpoint] = (len(statements), len(response.json()))
+    app.dependency_overrides.clear()
+    client.close()
+    engine.dispose()
+    return counts
+
+def measure() -> dict:
+    # Per endpoint, (statements, articles) with 5 and with 100 articles.
+    with tempfile.TemporaryDirectory() as directory:
+        small = statement_counts(directory, 5)
+        large = statement_counts(directory, 100)
+    return {endpoint: (small[endpoint], large[endpoint]) for endpoint in ENDPOINTS}
+
+def main():
+    counts = measure()
+    for endpoint, (small, large) in counts.items():
+        print(f"{endpoint}: {small[0]} statements for {small[1]} articles, "
+              f"{large[0]} statements for {large[1]} articles")
+    different = [endpoint for endpoint, (small, large) in counts.items() if small[0] != large[0]]
+    if different:
+        print(f"The number of statements grows with the page for: {', '.join(different)}")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# Fails if any filter combination of get_filtered_articles, the comment
+# listing, a typeahead prefix search or the facet summary makes SQLite fall
+# back to a full scan.
+#
+#   python -m benchmarks.query_plans
+import asyncio
+import itertools
+import os
+import re
+import sys
+import tempfile
+from datetime import date
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import insert, text
+from database import make_engine, make_async_engine
+from schema import create_schema
+from tables import User, Article, Comment, ArticleCommentLink
+from sample_data import generate_articles
+from ingest import ingest_rows
+from articles import filtered_articles_statement
+from typeahead import typeahead_statement
+from facets import summary_counts_statement
+
+FILTERS = {"year": {"year": "2010"},
+           "month": {"month": "06"},
+           "year+month": {"year": "2010", "month": "06"},
+           "date range": {"date_from": date(2010, 1, 1), "date_to": date(2010, 3, 31)},
+           "authors": {"authors": "Author 1, Author 2"},
+           "tags": {"tags": "Tag 1"},
+           "keywords": {"keywords": "neural"}}
+
+# Every SCAN step reads a whole table or index, covering or not. The one
+# exception is the FTS virtual table with a MATCH constraint (":M" in its
+# index string), which is an index lookup.
+FULL_SCAN = re.compile(r"\bSCAN (\w+)\b(?! VIRTUAL TABLE INDEX \d+:M)")
+# Scans accepted for one query only. A month without a year is one range per
+# year; SQLite walks the publication_date index in order instead and stops
+# once a page is full.
+ALLOWED_SCANS = {"month": {"SCAN article USING INDEX ix_article_publication_date"},
+                 # Reads of the top authors and tags, already cut to the limit.
+                 "facets summary": {"SCAN anon_1", "SCAN anon_2"}}
+
+def populate(engine, count: int):
+    with Session(engine) as session:
+        user = User(username="user1", hashed_password="password1")
+        session.add(user)
+        session.commit()
+        ingest_rows(session, generate_articles(count, 50, 20, 2, 2), user.id)
+        comments = session.exec(insert(Comment).returning(Comment.id, sort_by_parameter_order=True),
+                                params=[{"content": f"Comment {i}"} for i in range(count)]).all()
+        session.exec(insert(ArticleCommentLink),
+                     params=[{"article_id": i % 100 + 1, "comment_id": comment_id}
+                             for i, (comment_id,) in enumerate(comments)])
+        session.commit()
+
+def explain(engine, statement) -> str:
+    compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        plan = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return "; ".join(row[-1] for row in plan)
+
+async def filtered_statements(async_engine) -> dict:
+    statements = {}
+    async with AsyncSession(async_engine) as session:
+        for size in range(1, len(FILTERS) + 1):
+            for names in itertools.combinations(FILTERS, size):
+                if "year+month" in names and ("year" in names or "month" in names):
+                    continue
+                params = {"year": None, "month": None, "authors": None, "tags": None, "keywords": None}
+                for name in names:
+                    params.update(FILTERS[name])
+                statements[" & ".join(names)] = \
+                    await filtered_articles_statement(params["year"], params["month"], params["authors"],
+                                                      params["tags"], params["keywords"], session,
+                                                      date_from=params.get("date_from"),
+                                                      date_to=params.get("date_to"))
+    return statements
+
+def query_plans(count: int = 5000) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "plans.db")
+        engine = make_engine(f"sqlite:///{path}")
+        create_schema(engine)
+        populate(engine, count)
+        async_engine = make_async_engine(f"sqlite+aiosqlite:///{path}")
+
+        statements = asyncio.run(filtered_statements(async_engine))
+        statements["get_comments"] = select(Comment)\
+                                        .join(ArticleCommentLink, Comment.id == ArticleCommentLink.comment_id)\
+                                        .where(ArticleCommentLink.article_id == 1)\
+                                        .order_by(ArticleCommentLink.comment_id)\
+                                        .limit(100)
+        for facet in ("authors", "tags"):
+            statements[f"typeahead_{facet}"] = typeahead_statement(facet, "auth", 0, 20)
+        statements["facets summary"] = summary_counts_statement(50)
+        statements["comment -> article"] = select(Article)\
+                                              .join(ArticleCommentLink, Article.id == ArticleCommentLink.article_id)\
+                                              .where(ArticleCommentLink.comment_id == 1)
+        plans = {name: explain(engine, statement) for name, statement in statements.items()}
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+    return plans
+
+def full_scans(name: str, plan: str) -> list:
+    allowed = ALLOWED_SCANS.get(name, set())
+    return [step for step in plan.split("; ") if FULL_SCAN.search(step) and step not in allowed]
+
+def main():
+    plans = query_plans()
+    failures = 0
+    for name, plan in plans.items():
+        if full_scans(name, plan):
+            failures += 1
+            print(f"FULL SCAN  {name}: {plan}")
+        else:
+            print(f"ok         {name}")
+    if failures:
+        print(f"{failures} of {len(plans)} queries use a full scan.")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
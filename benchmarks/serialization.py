@@ -0,0 +1,108 @@
+# Per-row cost of building and encoding an article page: ORM objects that
+# are validated into ArticleRead models (what a response_model does), the
+# jsonable_encoder path the response cache used before, and the column-only
+# dict rows of articles.read_articles encoded with json and with orjson.
+#
+#   python -m benchmarks.serialization --articles 5000 --page-size 1000
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+import fastjson
+from database import make_engine, make_async_engine
+from schema import create_schema
+from tables import User, Article
+from models import ArticleRead
+from sample_data import generate_articles
+from ingest import ingest_rows
+from articles import ARTICLE_DETAILS, ARTICLE_ROW_COLUMNS, read_articles
+
+def populate(engine, count: int):
+    with Session(engine) as session:
+        user = User(username="user1", hashed_password="password1")
+        session.add(user)
+        session.commit()
+        ingest_rows(session, generate_articles(count, count // 10 or 1, 50, 3, 3), user.id)
+
+def article_models(articles: List[Article]) -> List[ArticleRead]:
+    return [ArticleRead(id=article.id,
+                        title=article.title,
+                        abstract=article.abstract,
+                        publication_date=article.publication_date,
+                        authors=[author.model_dump(include={"id", "name"}) for author in article.authors],
+                        tags=[tag.model_dump(include={"id", "name"}) for tag in article.tags],
+                        comment_count=article.comment_count)
+                for article in articles]
+
+async def orm_page(session: AsyncSession, page_size: int) -> List[Article]:
+    statement = select(Article).options(*ARTICLE_DETAILS).order_by(Article.id).limit(page_size)
+    return (await session.exec(statement)).all()
+
+async def row_page(session: AsyncSession, page_size: int) -> List[dict]:
+    return await read_articles(select(*ARTICLE_ROW_COLUMNS).order_by(Article.id).limit(page_size), session)
+
+def response_model_encode(articles: List[Article]) -> bytes:
+    adapter = TypeAdapter(List[ArticleRead])
+    return adapter.dump_json(adapter.validate_python(article_models(articles)))
+
+def jsonable_encode(articles: List[Article]) -> bytes:
+    return json.dumps(jsonable_encoder(article_models(articles)), separators=(",", ":")).encode()
+
+def json_encode(rows: List[dict]) -> bytes:
+    return json.dumps(rows, default=fastjson.default, ensure_ascii=False, separators=(",", ":")).encode()
+
+def orjson_encode(rows: List[dict]) -> bytes:
+    return fastjson.orjson.dumps(rows, default=fastjson.default)
+
+async def measure(async_engine, fetch, encode, page_size: int, repeat: int) -> tuple:
+    fetch_time = encode_time = 0.0
+    for _ in range(repeat):
+        async with AsyncSession(async_engine) as session:
+            started = time.perf_counter()
+            page = await fetch(session, page_size)
+            fetched = time.perf_counter()
+            body = encode(page)
+            fetch_time += fetched - started
+            encode_time += time.perf_counter() - fetched
+    rows = len(page) * repeat
+    return fetch_time / rows * 1e6, encode_time / rows * 1e6, len(body)
+
+async def benchmark(async_engine, page_size: int, repeat: int):
+    paths = [("orm + response_model", orm_page, response_model_encode),
+             ("orm + jsonable_encoder", orm_page, jsonable_encode),
+             ("rows + json", row_page, json_encode)]
+    if fastjson.orjson is not None:
+        paths.append(("rows + orjson", row_page, orjson_encode))
+    else:
+        print("orjson is not installed; skipping the orjson path.")
+    print(f"{'path':24} {'fetch':>12} {'encode':>12} {'total':>12}")
+    for name, fetch, encode in paths:
+        fetch_us, encode_us, size = await measure(async_engine, fetch, encode, page_size, repeat)
+        print(f"{name:24} {fetch_us:9.1f} us {encode_us:9.1f} us {fetch_us + encode_us:9.1f} us per row "
+              f"({size} bytes per page)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "serialization.db")
+        engine = make_engine(f"sqlite:///{path}")
+        create_schema(engine)
+        populate(engine, args.articles)
+        async_engine = make_async_engine(f"sqlite+aiosqlite:///{path}")
+        asyncio.run(benchmark(async_engine, args.page_size, args.repeat))
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import asyncio
+import socket
+import threading
+from contextlib import asynccontextmanager
+import uvicorn
+
+@asynccontextmanager
+async def running_server(app):
+    # The server gets its own thread and event loop so that a blocked
+    # server loop doesn't also stall the load generator.
+    with socket.socket() as probe_socket:
+        probe_socket.bind(("127.0.0.1", 0))
+        port = probe_socket.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        await asyncio.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
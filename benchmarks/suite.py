@@ -0,0 +1,295 @@
+# Benchmark suite over a seeded, production-sized dataset: every scenario
+# drives the real routers through an in-process server and reports p50/p95/
+# p99 latency, throughput and peak RSS. The results can be written as a JSON
+# baseline and compared with the baseline of another commit.
+#
+#   python -m benchmarks.suite --articles 100000 --output baseline.json
+#   python -m benchmarks.suite --articles 100000 --compare baseline.json
+#
+# Generated databases are kept in --data-dir and reused by later runs with
+# the same dataset parameters; building the 1M article dataset takes a while.
+# Every run works on a throwaway copy, so the writes of add_comment and of
+# the login setup never reach the kept dataset.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import httpx
+from contextlib import closing
+from sqlmodel import select, func
+
+RSS_SAMPLE_INTERVAL = 0.01
+
+class RssSampler:
+    # Peak resident set size while a scenario runs. ru_maxrss only ever
+    # grows, so /proc is sampled where it exists.
+    def __init__(self):
+        self.peak = 0
+        self.done = threading.Event()
+        self.thread = None
+
+    def current(self) -> int:
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Kilobytes on Linux, bytes on macOS.
+            return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+    def sample(self):
+        while not self.done.wait(RSS_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self.peak = self.current()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.done.set()
+        self.thread.join()
+        self.peak = max(self.peak, self.current())
+
+def dataset_name(args) -> str:
+    return f"suite-{args.articles}a-{args.authors}au-{args.tags}t-{args.authors_per_article}x{args.tags_per_article}" \
+           f"-{args.comments_per_article}c-{args.skew}s-{args.seed}.db"
+
+def copy_database(source: str, target: str):
+    # The backup API copies a consistent snapshot, WAL contents included.
+    with closing(sqlite3.connect(source)) as source_db, closing(sqlite3.connect(target)) as target_db:
+        source_db.backup(target_db)
+
+def build_dataset(args):
+    from database import engine
+    from schema import create_schema
+    from sample_data import add_sample_data
+    from tables import Article
+    create_schema(engine)
+    with engine.connect() as connection:
+        existing = connection.execute(select(func.count()).select_from(Article)).scalar()
+    if existing:
+        print(f"Reusing the dataset with {existing} articles.")
+        return
+    started = time.perf_counter()
+    report = add_sample_data(args.articles, args.authors, args.tags, args.authors_per_article,
+                             args.tags_per_article, args.seed, args.comments_per_article, args.skew)
+    print(f"Generated {report['inserted']} articles and {report['comments']} comments "
+          f"in {time.perf_counter() - started:.1f} s.")
+
+def scenarios(args, token: str) -> dict:
+    # Each scenario returns the arguments of one request; the parameters are
+    # drawn from a seeded generator so runs are comparable.
+    from sample_data import WORDS
+    authorization = {"Authorization": f"Bearer {token}"}
+    articles = args.articles
+
+    def article_id(generator):
+        # Comments are skewed to the low ids too, so these are the hot articles.
+        return generator.randrange(1, max(2, min(articles, 100)))
+
+    def year(generator):
+        return str(generator.randrange(2000, 2025))
+
+    def names(prefix, count, generator, picked=2):
+        return ", ".join(f"{prefix} {generator.randrange(count) + 1}" for _ in range(picked))
+
+    return {
+        "login": lambda g: ("POST", "/auth/token",
+                            {"data": {"username": "bench", "password": "bench-password"}}),
+        "get_authors": lambda g: ("GET", "/articles/get_authors", {}),
+        "get_tags": lambda g: ("GET", "/articles/get_tags", {}),
+        "filtered_first_page": lambda g: ("GET", "/articles/get_filtered_articles", {}),
+        "filtered_year": lambda g: ("GET", "/articles/get_filtered_articles", {"params": {"year": year(g)}}),
+        "filtered_year_month": lambda g: ("GET", "/articles/get_filtered_articles",
+                                          {"params": {"year": year(g), "month": f"{g.randrange(1, 13):02}"}}),
+        "filtered_authors": lambda g: ("GET", "/articles/get_filtered_articles",
+                                       {"params": {"authors": names("Author", args.authors, g)}}),
+        "filtered_tags": lambda g: ("GET", "/articles/get_filtered_articles",
+                                    {"params": {"tags": names("Tag", args.tags, g, 1)}}),
+        "filtered_keywords": lambda g: ("GET", "/articles/get_filtered_articles",
+                                        {"params": {"keywords": g.choice(WORDS)}}),
+        "filtered_deep_page": lambda g: ("GET", "/articles/get_filtered_articles",
+                                         {"params": {"page": g.randrange(10, 50)}}),
+        "typeahead_authors": lambda g: ("GET", "/articles/typeahead_authors",
+                                        {"params": {"prefix": f"author {g.randrange(1, 10)}"}}),
+        "typeahead_tags": lambda g: ("GET", "/articles/typeahead_tags", {"params": {"prefix": "t"}}),
+        "facets": lambda g: ("GET", "/articles/get_facets", {}),
+        "facets_year": lambda g: ("GET", "/articles/get_facets", {"params": {"year": year(g)}}),
+        "get_comments": lambda g: ("GET", "/comments/get_comments", {"params": {"article_id": article_id(g)}}),
+        "download_year": lambda g: ("GET", "/articles/download_filtered_articles", {"params": {"year": year(g)}}),
+        "add_comment": lambda g: ("POST", "/comments/add_comment",
+                                  {"json": {"article_id": article_id(g), "content": "Benchmark comment"},
+                                   "headers": authorization}),
+        "get_all_articles": lambda g: ("GET", "/articles/get_all_articles", {}),
+    }
+
+async def run_scenario(client: httpx.AsyncClient, scenario, requests: int, concurrency: int, seed: int) -> dict:
+    generator = random.Random(seed)
+    calls = [scenario(generator) for _ in range(requests)]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(method, path, kwargs):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400 and response.status_code != 404:
+                errors += 1
+
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*[one(*call) for call in calls])
+        elapsed = time.perf_counter() - started
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {"requests": requests,
+            "errors": errors,
+            "rps": round(requests / elapsed, 2),
+            "p50_ms": round(percentiles[49] * 1000, 3),
+            "p95_ms": round(percentiles[94] * 1000, 3),
+            "p99_ms": round(percentiles[98] * 1000, 3),
+            "peak_rss_mb": round(rss.peak / 2 ** 20, 1)}
+
+async def benchmark(args) -> dict:
+    from cache import response_cache
+    from main import app
+    from benchmarks.server import running_server
+
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    results = {}
+    async with running_server(app) as base_url, \
+               httpx.AsyncClient(base_url=base_url, limits=limits, timeout=600) as client:
+        credentials = {"username": "bench", "password": "bench-password"}
+        response = await client.post("/auth/token", data=credentials)
+        if response.status_code == 401:
+            # A new dataset; reused ones already have the user.
+            (await client.post("/auth/", json=credentials)).raise_for_status()
+            response = await client.post("/auth/token", data=credentials)
+        response.raise_for_status()
+        selected = scenarios(args, response.json()["access_token"])
+        for name, scenario in selected.items():
+            if args.only and name not in args.only:
+                continue
+            # Every scenario starts with a cold response cache.
+            await response_cache.bump()
+            requests = args.login_requests if name == "login" else args.requests
+            results[name] = await run_scenario(client, scenario, requests, args.concurrency, args.seed)
+            result = results[name]
+            print(f"{name:22} {result['rps']:9.1f} req/s  p50 {result['p50_ms']:8.2f} ms  "
+                  f"p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+                  f"peak RSS {result['peak_rss_mb']:7.1f} MB  errors {result['errors']}")
+    return results
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        return ""
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    # A regression is a latency percentile that grew, or a throughput that
+    # dropped, by more than the threshold (a fraction).
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        changes = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"):
+            change = (result[key] - before[key]) / before[key] if before[key] else 0.0
+            changes.append(f"{key} {change:+.0%}")
+            if change > threshold:
+                regressions.append(f"{name} {key}: {before[key]} -> {result[key]}")
+        change = (result["rps"] - before["rps"]) / before["rps"] if before["rps"] else 0.0
+        changes.append(f"rps {change:+.0%}")
+        if -change > threshold:
+            regressions.append(f"{name} rps: {before['rps']} -> {result['rps']}")
+        print(f"{name:22} " + "  ".join(changes))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=10000)
+    parser.add_argument("--authors", type=int, default=None, help="Defaults to one per 20 articles.")
+    parser.add_argument("--tags", type=int, default=None, help="Defaults to one per 200 articles.")
+    parser.add_argument("--authors-per-article", type=int, default=3)
+    parser.add_argument("--tags-per-article", type=int, default=3)
+    parser.add_argument("--comments-per-article", type=float, default=2.0)
+    parser.add_argument("--skew", type=float, default=1.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--login-requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--only", nargs="*", help="Scenario names to run.")
+    parser.add_argument("--no-response-cache", action="store_true")
+    parser.add_argument("--data-dir", help="Keeps the generated databases for later runs.")
+    parser.add_argument("--output", help="Writes the results as a JSON baseline.")
+    parser.add_argument("--compare", help="A baseline to compare the results with.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Exit with status 1 when a metric is this much worse than the baseline.")
+    args = parser.parse_args()
+    args.authors = args.authors or max(2, args.articles // 20)
+    args.tags = args.tags or max(2, args.articles // 200)
+
+    with tempfile.TemporaryDirectory() as directory:
+        kept = os.path.join(os.path.abspath(args.data_dir), dataset_name(args)) if args.data_dir else None
+        path = os.path.join(directory, dataset_name(args))
+        if kept and os.path.exists(kept):
+            copy_database(kept, path)
+        # Must be set before the application modules create their engines.
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        # Slow query and slow request logs would drown the report.
+        os.environ.setdefault("LOG_LEVEL", "ERROR")
+        if args.no_response_cache:
+            os.environ["RESPONSE_CACHE_SIZE"] = "0"
+            os.environ.pop("RESPONSE_CACHE_URL", None)
+        build_dataset(args)
+        if kept and not os.path.exists(kept):
+            os.makedirs(args.data_dir, exist_ok=True)
+            copy_database(path, kept)
+        results = asyncio.run(benchmark(args))
+
+    report = {"meta": {"commit": git_commit(),
+                       "python": platform.python_version(),
+                       "platform": platform.platform(),
+                       "dataset": {key: getattr(args, key) for key in ("articles", "authors", "tags",
+                                                                      "authors_per_article", "tags_per_article",
+                                                                      "comments_per_article", "skew", "seed")},
+                       "requests": args.requests,
+                       "concurrency": args.concurrency,
+                       "response_cache": not args.no_response_cache},
+              "results": results}
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["meta"]["dataset"] != report["meta"]["dataset"]:
+            print("Warning: the baseline was measured on a different dataset.")
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print("Regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+from fastapi import Request, Response
+from collections import OrderedDict
+from fastjson import dumps
+from threading import Lock
+import hashlib
+import json
+import os
+import time
+
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+# "data" changes with every write and keys the cached responses; "articles"
+# only with article writes, the data that export files hold.
+VERSIONS = ("data", "articles")
+
+class TTLCache:
+    # Bounded LRU cache whose entries also expire after a time to live.
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.entries),
+                "maxsize": self.maxsize}
+
+class MemoryBackend:
+    # Per-process storage; with several workers each one keeps its own
+    # version, so use a shared backend there.
+    shared = False
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize, ttl)
+        # Start from the clock: restarting at 0 would reuse the versions,
+        # and so the ETags and export files, of data that has since changed.
+        seed = time.time_ns() // 1000000
+        self.versions = {name: seed for name in VERSIONS}
+
+    async def get(self, key: str):
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: tuple):
+        self.entries.set(key, value)
+
+    async def version(self, name: str = "data") -> int:
+        return self.versions[name]
+
+    async def bump(self, name: str = "data"):
+        self.versions[name] += 1
+
+class RedisBackend:
+    shared = True
+
+    def __init__(self, url: str, ttl: float, prefix: str = "response-cache:"):
+        import redis.asyncio
+        self.client = redis.asyncio.Redis.from_url(url)
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    async def get(self, key: str):
+        value = await self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        entry = json.loads(value)
+        return entry["body"].encode(), entry["headers"]
+
+    async def set(self, key: str, value: tuple):
+        body, headers = value
+        entry = json.dumps({"body": body.decode(), "headers": headers})
+        await self.client.set(self.prefix + key, entry, ex=self.ttl)
+
+    def version_key(self, name: str) -> str:
+        return self.prefix + ("version" if name == "data" else f"{name}-version")
+
+    async def version(self, name: str = "data") -> int:
+        key = self.version_key(name)
+        version = await self.client.get(key)
+        if version is None:
+            # Lost to a flush, restart or eviction: seeded from the clock, as
+            # in MemoryBackend, so earlier versions aren't handed out again.
+            await self.client.set(key, time.time_ns() // 1000000, nx=True)
+            version = await self.client.get(key)
+        return int(version)
+
+    async def bump(self, name: str = "data"):
+        # Seeds a missing version first; incr alone would restart it at 1.
+        await self.version(name)
+        await self.client.incr(self.version_key(name))
+
+class ResponseCache:
+    # Cached JSON bodies are stored under the data version, which every
+    # write bumps, so a write makes all older entries unreachable at once.
+    # The ETag is derived from the version and the key alone (plus a TTL
+    # window for per-process versions), so a matching If-None-Match is
+    # answered with a 304 before any query runs.
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def etag_window(self) -> str:
+        # Writes from other processes, e.g. the ingest CLI, never bump a
+        # per-process version. Its ETags, and the bodies cached under them,
+        # change every TTL instead, so such writes show up at most a TTL late.
+        if self.shared:
+            return ""
+        if RESPONSE_CACHE_TTL <= 0:
+            return f"-{time.time_ns()}"
+        return f"-{int(time.time() // RESPONSE_CACHE_TTL)}"
+
+    def make_key(self, namespace: str, params: dict) -> str:
+        normalized = sorted((name, value) for name, value in params.items() if value not in (None, "", []))
+        return namespace + ":" + json.dumps(normalized, default=str, separators=(",", ":"))
+
+    async def respond(self, request: Request, namespace: str, params: dict, build) -> Response:
+        version = f"{await self.backend.version()}{self.etag_window()}"
+        key = self.make_key(namespace, params)
+        etag = f'"{version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        entry = await self.backend.get(f"{version}:{key}")
+        if entry is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            content, extra_headers = await build()
+            body = dumps(content)
+            entry = (body, extra_headers)
+            await self.backend.set(f"{version}:{key}", entry)
+        body, extra_headers = entry
+        return Response(content=body, media_type="application/json", headers={**extra_headers, **headers})
+
+    @property
+    def shared(self) -> bool:
+        # Whether every worker process sees the same data version.
+        return self.backend.shared
+
+    async def version(self, name: str = "data") -> int:
+        return await self.backend.version(name)
+
+    async def bump(self, articles: bool = False):
+        # Every write bumps the data version; article writes also bump the
+        # articles version, which export files are kept under.
+        await self.backend.bump()
+        if articles:
+            await self.backend.bump("articles")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified}
+
+def make_response_cache() -> ResponseCache:
+    if RESPONSE_CACHE_URL:
+        return ResponseCache(RedisBackend(RESPONSE_CACHE_URL, RESPONSE_CACHE_TTL))
+    return ResponseCache(MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL))
+
+response_cache = make_response_cache()
@@ -1,38 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import SQLModel, Session, select, create_engine
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import selectinload
 from starlette import status
+from database import get_session
 from tables import User, Article, Comment, ArticleCommentLink
 from models import CommentCreate, CommentDelete, CommentUpdate
-from auth import get_current_user
-from typing import List
+from auth import get_current_user, get_current_user_model
+from cache import response_cache
+from fastjson import FastJSONResponse
+from typing import List, Optional
 from starlette import status
+from sqlalchemy import update
+import os
+
+DEFAULT_PAGE_SIZE = int(os.getenv("COMMENTS_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("COMMENTS_MAX_PAGE_SIZE", "1000"))
 
 router = APIRouter(prefix="/comments", 
                     tags=["comments"])
 
-engine = create_engine("sqlite:///./test.db")
-SQLModel.metadata.create_all(engine)
-
-def get_session():
-    with Session(engine) as session:
-        yield session
-
 @router.get("/get_comments", response_model=List[Comment])
 async def get_comment(article_id: int=None,
-                      session: Session = Depends(get_session)):
-    statement = select(Comment)\
+                      page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                      cursor: Optional[int] = None,
+                      session: AsyncSession = Depends(get_session)):
+    # Comments come oldest first; the cursor is the last comment id seen.
+    statement = select(Comment.id, Comment.content)\
                     .join(ArticleCommentLink, Comment.id == ArticleCommentLink.comment_id)\
-                    .where(ArticleCommentLink.article_id == article_id)
-    comments = session.exec(statement).all()
-    print(comments)
-    return comments
+                    .where(ArticleCommentLink.article_id == article_id)\
+                    .order_by(ArticleCommentLink.comment_id)\
+                    .limit(page_size)
+    if cursor is not None:
+        statement = statement.where(ArticleCommentLink.comment_id > cursor)
+    comments = [row._asdict() for row in await session.exec(statement)]
+    headers = {}
+    if len(comments) == page_size:
+        headers["X-Next-Cursor"] = str(comments[-1]["id"])
+    return FastJSONResponse(comments, headers=headers)
 
 @router.post("/add_comment", response_model=Comment)
 async def add_comment(request: CommentCreate,
-                      user: dict = Depends(get_current_user),
-                      session: Session = Depends(get_session)):
-    article = session.get(Article, request.article_id)
-    user = session.get(User, user["id"])
+                      user: User = Depends(get_current_user_model),
+                      session: AsyncSession = Depends(get_session)):
+    article = await session.get(Article, request.article_id)
 
     if not article:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -42,14 +53,18 @@ async def add_comment(request: CommentCreate,
                       article=article,
                       user=user)
     session.add(comment)
-    session.commit()
+    await change_comment_count(article.id, 1, session)
+    await session.commit()
+    # Article listings carry comment counts.
+    await response_cache.bump()
     return comment
 
 @router.post("/update_comment", response_model=Comment)
 async def update_comment(request: CommentUpdate,
                          user: dict = Depends(get_current_user),
-                         session: Session = Depends(get_session)):
-    comment = session.get(Comment, request.comment_id)
+                         session: AsyncSession = Depends(get_session)):
+    comment = await session.get(Comment, request.comment_id,
+                                options=[selectinload(Comment.user)])
     
     if not comment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -58,15 +73,17 @@ async def update_comment(request: CommentUpdate,
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Unauthorized action.")
     comment.content = request.content
-    session.commit()
+    await session.commit()
     return comment
 
 @router.delete("/delete_comment", status_code=204)
 async def delete_comment(request: CommentDelete,
                          user: dict = Depends(get_current_user),
-                         session: Session = Depends(get_session)):
+                         session: AsyncSession = Depends(get_session)):
     
-    comment = session.get(Comment, request.comment_id)
+    # Deleting needs the link relationships loaded, lazy loads can't run here.
+    comment = await session.get(Comment, request.comment_id,
+                                options=[selectinload(Comment.user), selectinload(Comment.article)])
 
     if not comment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -74,7 +91,18 @@ async def delete_comment(request: CommentDelete,
     if comment.user.id != user["id"]:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Unauthorized action.")
-    session.delete(comment)
-    session.commit()
+    if comment.article:
+        await change_comment_count(comment.article.id, -1, session)
+    await session.delete(comment)
+    await session.commit()
+    await response_cache.bump()
     return {"message": "Comment deleted."}
 
+async def change_comment_count(article_id: int, change: int, session: AsyncSession):
+    # Incremented in SQL so concurrent comment writes can't lose an update.
+    statement = update(Article)\
+                    .where(Article.id == article_id)\
+                    .values(comment_count=Article.comment_count + change)\
+                    .execution_options(synchronize_session=False)
+    await session.exec(statement)
+
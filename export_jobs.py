@@ -0,0 +1,209 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.engine import Engine
+from threading import Lock
+from exports import ENCODERS, get_encoder, iter_export, gzip_chunks
+from typing import List, Optional
+import logging
+import os
+import shutil
+import socket
+import tempfile
+
+EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", "2"))
+EXPORT_JOB_MAX_PENDING = int(os.getenv("EXPORT_JOB_MAX_PENDING", "100"))
+EXPORT_JOB_DIR = os.getenv("EXPORT_JOB_DIR", os.path.join(tempfile.gettempdir(), "article-exports"))
+
+logger = logging.getLogger("app.exports")
+
+# Each job holds a database connection for its whole run, so the pool also
+# bounds how many exports compete with requests for the database.
+export_executor = ThreadPoolExecutor(max_workers=EXPORT_JOB_WORKERS, thread_name_prefix="export")
+
+# Where this process writes its files: EXPORT_JOB_DIR itself when the
+# version is shared, otherwise a directory of its own; see prepare().
+job_dir = EXPORT_JOB_DIR
+
+class ExportJob:
+    def __init__(self, job_id: str, export_format: str, compression: Optional[str], status: str = "pending"):
+        self.id = job_id
+        self.version = int(job_id.split("-", 1)[0])
+        self.format = export_format
+        self.compression = compression
+        self.status = status
+        self.error = None
+        # Set once the job is stale and no longer tracked; a run that is
+        # still pending or writing then throws its output away.
+        self.dropped = False
+
+    @property
+    def extension(self) -> str:
+        return ENCODERS[self.format].extension + (".gz" if self.compression == "gzip" else "")
+
+    @property
+    def media_type(self) -> str:
+        return "application/gzip" if self.compression == "gzip" else ENCODERS[self.format].media_type
+
+    @property
+    def path(self) -> str:
+        return os.path.join(job_dir, f"{self.id}.{self.extension}")
+
+    def read(self, current_version: int) -> dict:
+        # current_version is the articles version: any article write after
+        # the job was submitted makes its file stale.
+        finished = self.status == "done" and os.path.exists(self.path)
+        if self.version != current_version or (self.status == "done" and not finished):
+            status = "expired"
+        else:
+            status = self.status
+        return {"id": self.id,
+                "status": status,
+                "format": self.format,
+                "compression": self.compression,
+                "size": os.path.getsize(self.path) if finished else None,
+                "error": self.error}
+
+jobs = {}
+jobs_lock = Lock()
+
+def make_job_id(version: int, key_hash: str) -> str:
+    # Identical normalized filters under the same articles version get the same
+    # id, so every submitter shares one file. Across worker processes only
+    # when the version is shared (RESPONSE_CACHE_URL): per-process versions
+    # say nothing about the data another process exported.
+    return f"{version}-{key_hash}"
+
+def run_job(job: ExportJob, engine: Engine, statement, columns: List[str]):
+    if job.dropped:
+        return
+    job.status = "running"
+    # Written under a per-process name and renamed once complete, so a
+    # partial file is never served.
+    partial = f"{job.path}.{os.getpid()}.part"
+    try:
+        chunks = iter_export(engine, statement, columns, get_encoder(job.format, columns))
+        if job.compression == "gzip":
+            chunks = gzip_chunks(chunks)
+        with open(partial, "wb") as output:
+            for chunk in chunks:
+                output.write(chunk)
+        # Under the lock remove_stale drops jobs with, so a dropped job's
+        # file is either never renamed or removed by remove_stale.
+        with jobs_lock:
+            if job.dropped:
+                os.remove(partial)
+                return
+            os.replace(partial, job.path)
+            job.status = "done"
+    except Exception as error:
+        logger.exception("export job failed", extra={"job_id": job.id})
+        job.status = "failed"
+        job.error = str(error)
+        if os.path.exists(partial):
+            os.remove(partial)
+
+def remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def remove_stale(version: int, shared: bool):
+    # Files of this process's jobs from other articles versions are never
+    # served again; pending and running ones discard their output. Another
+    # process's files are only known to be stale when the version is shared
+    # and theirs is older; partial files are left to the job still writing them.
+    with jobs_lock:
+        stale = [job for job in jobs.values() if job.version != version]
+        for job in stale:
+            job.dropped = True
+            del jobs[job.id]
+    for job in stale:
+        if job.status == "done":
+            remove_file(job.path)
+    if not shared:
+        return
+    for name in os.listdir(job_dir):
+        file_version = name.split("-", 1)[0]
+        if file_version.isdigit() and int(file_version) < version and not name.endswith(".part"):
+            remove_file(os.path.join(job_dir, name))
+
+def process_running(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill would terminate the process there.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def prepare(version: int, shared: bool):
+    # Run once per worker at startup. With a shared version the files of
+    # older versions are removed. Without one, this process's versions mean
+    # nothing to others: it gets a directory of its own, and the job files of
+    # processes on this host that no longer run, whose jobs were lost with
+    # them, are removed.
+    global job_dir
+    os.makedirs(EXPORT_JOB_DIR, exist_ok=True)
+    if shared:
+        job_dir = EXPORT_JOB_DIR
+        remove_stale(version, shared)
+        return
+    own_prefix = f"process-{socket.gethostname()}-"
+    for name in os.listdir(EXPORT_JOB_DIR):
+        path = os.path.join(EXPORT_JOB_DIR, name)
+        if name.startswith(own_prefix) and name[len(own_prefix):].isdigit():
+            pid = int(name[len(own_prefix):])
+            if pid == os.getpid() or not process_running(pid):
+                shutil.rmtree(path, ignore_errors=True)
+        elif name.split("-", 1)[0].isdigit() and os.path.isfile(path):
+            # Files of an earlier process that wrote to EXPORT_JOB_DIR itself.
+            remove_file(path)
+    job_dir = os.path.join(EXPORT_JOB_DIR, f"{own_prefix}{os.getpid()}")
+    os.makedirs(job_dir, exist_ok=True)
+
+def finished_job(job_id: str) -> Optional[ExportJob]:
+    # A job run by another worker process is known by its finished file.
+    if not os.path.isdir(job_dir):
+        return None
+    for name in os.listdir(job_dir):
+        if name.startswith(job_id + ".") and not name.endswith(".part"):
+            extension = name[len(job_id) + 1:]
+            compression = "gzip" if extension.endswith(".gz") else None
+            export_format = extension.split(".")[0]
+            if export_format in ENCODERS:
+                return ExportJob(job_id, export_format, compression, status="done")
+    return None
+
+def submit(engine: Engine, job_id: str, statement, columns: List[str],
+           export_format: str, compression: Optional[str], shared: bool) -> Optional[ExportJob]:
+    # Returns the running or finished job for the same filters if there is
+    # one, and None when too many jobs are waiting. shared says whether the
+    # job's version is shared by all worker processes, so that their
+    # finished files can be served too.
+    os.makedirs(job_dir, exist_ok=True)
+    job = ExportJob(job_id, export_format, compression)
+    remove_stale(job.version, shared)
+    with jobs_lock:
+        existing = jobs.get(job_id)
+        if existing is not None and existing.status != "failed" and \
+                (existing.status != "done" or os.path.exists(existing.path)):
+            return existing
+        if shared and os.path.exists(job.path):
+            job.status = "done"
+            jobs[job_id] = job
+            return job
+        if sum(other.status in ("pending", "running") for other in jobs.values()) >= EXPORT_JOB_MAX_PENDING:
+            return None
+        jobs[job_id] = job
+    export_executor.submit(run_job, job, engine, statement, columns)
+    return job
+
+def get_job(job_id: str, shared: bool) -> Optional[ExportJob]:
+    with jobs_lock:
+        job = jobs.get(job_id)
+    if job is None and shared:
+        return finished_job(job_id)
+    return job
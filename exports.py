@@ -0,0 +1,215 @@
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select
+from sqlalchemy.engine import Engine
+from starlette import status
+from tables import Article, Author, Tag, ArticleAuthorLink, ArticleTagLink
+from typing import Iterable, Iterator, List, Optional
+import csv
+import json
+import os
+import zlib
+from io import StringIO, RawIOBase
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+ARTICLE_COLUMNS = ["id", "title", "abstract"]
+EXTRA_COLUMNS = ["publication_date", "authors", "tags"]
+EXPORT_FORMATS = ["csv", "ndjson", "arrow", "parquet"]
+
+def parse_columns(columns: Optional[str]) -> List[str]:
+    if not columns:
+        return list(ARTICLE_COLUMNS)
+    extra = [column.strip() for column in columns.split(",") if column.strip()]
+    unknown = [column for column in extra if column not in EXTRA_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Unknown columns: {', '.join(unknown)}.")
+    return ARTICLE_COLUMNS + [column for column in EXTRA_COLUMNS if column in extra]
+
+def linked_names(session: Session, link_model, name_model, key: str, article_ids: List[int]) -> dict:
+    statement = select(link_model.article_id, name_model.name)\
+                    .join(name_model, name_model.id == getattr(link_model, key))\
+                    .where(link_model.article_id.in_(article_ids))\
+                    .order_by(link_model.article_id, name_model.id)
+    names = {}
+    for article_id, name in session.exec(statement):
+        names.setdefault(article_id, []).append(name)
+    return names
+
+def article_rows(session: Session, articles: List[Article], columns: List[str]) -> List[dict]:
+    # Authors and tags are fetched with one query per chunk, not per row.
+    article_ids = [article.id for article in articles]
+    authors = linked_names(session, ArticleAuthorLink, Author, "author_id", article_ids) if "authors" in columns else {}
+    tags = linked_names(session, ArticleTagLink, Tag, "tag_id", article_ids) if "tags" in columns else {}
+    rows = []
+    for article in articles:
+        row = {"id": article.id, "title": article.title, "abstract": article.abstract}
+        if "publication_date" in columns:
+            row["publication_date"] = article.publication_date
+        if "authors" in columns:
+            row["authors"] = authors.get(article.id, [])
+        if "tags" in columns:
+            row["tags"] = tags.get(article.id, [])
+        rows.append(row)
+    return rows
+
+class CsvEncoder:
+    media_type = "text/csv"
+    extension = "csv"
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.buffer = StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def drain(self) -> bytes:
+        data = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def header(self) -> bytes:
+        self.writer.writerow(self.columns)
+        return self.drain()
+
+    def encode(self, rows: List[dict]) -> bytes:
+        for row in rows:
+            self.writer.writerow(["; ".join(value) if isinstance(value, list) else value
+                                  for value in (row[column] for column in self.columns)])
+        return self.drain()
+
+    def finish(self) -> bytes:
+        return b""
+
+class NdjsonEncoder:
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows: List[dict]) -> bytes:
+        return "".join(json.dumps(row, default=str) + "\n" for row in rows).encode()
+
+    def finish(self) -> bytes:
+        return b""
+
+class ChunkSink(RawIOBase):
+    # File-like target for the pyarrow writers, drained after every batch.
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+class ArrowEncoder:
+    media_type = "application/vnd.apache.arrow.stream"
+    extension = "arrow"
+
+    def __init__(self, columns: List[str]):
+        types = {"id": pyarrow.int64(),
+                 "title": pyarrow.string(),
+                 "abstract": pyarrow.string(),
+                 "publication_date": pyarrow.date32(),
+                 "authors": pyarrow.list_(pyarrow.string()),
+                 "tags": pyarrow.list_(pyarrow.string())}
+        self.columns = columns
+        self.schema = pyarrow.schema([(column, types[column]) for column in columns])
+        self.sink = ChunkSink()
+        self.writer = None
+
+    def open_writer(self):
+        return pyarrow.ipc.new_stream(self.sink, self.schema)
+
+    def header(self) -> bytes:
+        self.writer = self.open_writer()
+        return self.sink.drain()
+
+    def encode(self, rows: List[dict]) -> bytes:
+        # One record batch per chunk, built column by column.
+        arrays = [pyarrow.array([row[column] for row in rows], type=self.schema.field(column).type)
+                  for column in self.columns]
+        self.writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema))
+        return self.sink.drain()
+
+    def finish(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+class ParquetEncoder(ArrowEncoder):
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def open_writer(self):
+        return pyarrow.parquet.ParquetWriter(self.sink, self.schema)
+
+ENCODERS = {"csv": CsvEncoder,
+            "ndjson": NdjsonEncoder,
+            "arrow": ArrowEncoder,
+            "parquet": ParquetEncoder}
+
+def get_encoder(export_format: str, columns: List[str]):
+    if export_format in ("arrow", "parquet") and pyarrow is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"The {export_format} format requires pyarrow to be installed.")
+    return ENCODERS[export_format](columns)
+
+def iter_export(engine: Engine, statement, columns: List[str], encoder) -> Iterator[bytes]:
+    # Runs in its own session because the response body is produced after
+    # the request's session dependency has been closed.
+    with Session(engine) as session:
+        yield encoder.header()
+        result = session.exec(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        for articles in result.partitions():
+            yield encoder.encode(article_rows(session, articles, columns))
+        yield encoder.finish()
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_response(engine: Engine,
+                    statement,
+                    columns: List[str],
+                    export_format: str = "csv",
+                    compression: Optional[str] = None) -> StreamingResponse:
+    encoder = get_encoder(export_format, columns)
+    filename = f"articles.{encoder.extension}"
+    media_type = encoder.media_type
+    chunks = iter_export(engine, statement, columns, encoder)
+    if compression == "gzip":
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+    headers = {
+        'Content-Disposition': f'attachment; filename="{filename}"'
+    }
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
@@ -0,0 +1,87 @@
+from sqlalchemy import inspect, table, column, select, func, literal, null, extract, union_all, Integer, String
+from sqlalchemy.engine import Engine
+from tables import Article, Author, Tag, ArticleAuthorLink, ArticleTagLink
+import os
+
+FACET_SUMMARY_TABLE = "facet_count"
+FACET_SUMMARY = os.getenv("FACET_SUMMARY", "1") == "1"
+
+# Article counts per author, tag and publication month for the whole table,
+# created by a migration and kept current by its triggers.
+facet_count = table(FACET_SUMMARY_TABLE, column("facet", String), column("value", String), column("count", Integer))
+
+summary_enabled = False
+
+def load_facet_summary(engine: Engine):
+    global summary_enabled
+    summary_enabled = FACET_SUMMARY and engine.dialect.name == "sqlite" and \
+        inspect(engine).has_table(FACET_SUMMARY_TABLE)
+
+def top_values(statement, count, limit: int):
+    # The most used authors or tags, ranked in SQL. Wrapped in a subquery
+    # since a member of a UNION ALL can't have its own ORDER BY and LIMIT.
+    columns = statement.selected_columns
+    return select(statement.order_by(count.desc(), columns.name, columns.id).limit(limit).subquery())
+
+def facet_counts_statement(filtered, limit: int):
+    # One UNION ALL over the filtered article ids: a grouped count per
+    # author and per tag, the top limit of each, and per publication month.
+    article_ids = filtered.with_only_columns(Article.id).order_by(None).subquery()
+    author_count = func.count()
+    authors = select(literal("authors").label("facet"), Author.id.label("id"), Author.name.label("name"),
+                     null().label("year"), null().label("month"), author_count.label("count"))\
+                .select_from(article_ids)\
+                .join(ArticleAuthorLink, ArticleAuthorLink.article_id == article_ids.c.id)\
+                .join(Author, Author.id == ArticleAuthorLink.author_id)\
+                .group_by(Author.id, Author.name)
+    tag_count = func.count()
+    tags = select(literal("tags").label("facet"), Tag.id.label("id"), Tag.name.label("name"),
+                  null().label("year"), null().label("month"), tag_count.label("count"))\
+                .select_from(article_ids)\
+                .join(ArticleTagLink, ArticleTagLink.article_id == article_ids.c.id)\
+                .join(Tag, Tag.id == ArticleTagLink.tag_id)\
+                .group_by(Tag.id, Tag.name)
+    year = extract("year", Article.publication_date)
+    month = extract("month", Article.publication_date)
+    months = select(literal("months"), null(), null(), year, month, func.count())\
+                .select_from(article_ids)\
+                .join(Article, Article.id == article_ids.c.id)\
+                .where(Article.publication_date.is_not(None))\
+                .group_by(year, month)
+    return union_all(top_values(authors, author_count, limit), top_values(tags, tag_count, limit), months)
+
+def summary_counts_statement(limit: int):
+    # Same rows as facet_counts_statement() for the unfiltered case, read
+    # from the trigger maintained summary. The top authors and tags come
+    # off ix_facet_count_facet_count, so only about limit rows are read
+    # per facet, however many authors and tags there are.
+    summary = facet_count
+    authors = select(literal("authors").label("facet"), Author.id.label("id"), Author.name.label("name"),
+                     null().label("year"), null().label("month"), summary.c.count)\
+                .join(Author, Author.id == summary.c.value.cast(Integer))\
+                .where(summary.c.facet == "authors", summary.c.count > 0)
+    tags = select(literal("tags").label("facet"), Tag.id.label("id"), Tag.name.label("name"),
+                  null().label("year"), null().label("month"), summary.c.count)\
+                .join(Tag, Tag.id == summary.c.value.cast(Integer))\
+                .where(summary.c.facet == "tags", summary.c.count > 0)
+    months = select(literal("months"), null(), null(),
+                    func.substr(summary.c.value, 1, 4).cast(Integer), func.substr(summary.c.value, 6, 2).cast(Integer),
+                    summary.c.count)\
+                .where(summary.c.facet == "months", summary.c.count > 0)
+    return union_all(top_values(authors, summary.c.count, limit), top_values(tags, summary.c.count, limit), months)
+
+def group_facets(rows, limit: int) -> dict:
+    facets = {"authors": [], "tags": [], "years": [], "months": []}
+    years = {}
+    for facet, facet_id, name, year, month, count in rows:
+        if facet == "months":
+            facets["months"].append({"year": int(year), "month": int(month), "count": count})
+            years[int(year)] = years.get(int(year), 0) + count
+        else:
+            facets[facet].append({"id": facet_id, "name": name, "count": count})
+    facets["years"] = [{"year": year, "count": count} for year, count in years.items()]
+    for name in ("authors", "tags"):
+        facets[name] = sorted(facets[name], key=lambda value: (-value["count"], value["name"], value["id"]))[:limit]
+    facets["years"].sort(key=lambda value: value["year"])
+    facets["months"].sort(key=lambda value: (value["year"], value["month"]))
+    return facets
@@ -0,0 +1,36 @@
+from fastapi import Response
+from pydantic import BaseModel
+from datetime import date, datetime
+from typing import Any
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Set to 0 to encode with the standard library even when orjson is installed.
+FAST_JSON = os.getenv("FAST_JSON", "1") == "1"
+
+def default(value: Any):
+    # Rows are plain dicts, lists, dates and numbers; models are only a
+    # fallback for handlers that still return them.
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None and FAST_JSON:
+        return orjson.dumps(content, default=default)
+    return json.dumps(content, default=default, ensure_ascii=False, separators=(",", ":")).encode()
+
+class FastJSONResponse(Response):
+    # Encodes the content as is: unlike returning it from a handler with a
+    # response_model, nothing is validated again on the way out.
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,139 @@
+from sqlmodel import Session, select
+from sqlalchemy import insert
+from pydantic import ValidationError
+from tables import User, Article, Author, Tag, ArticleAuthorLink, ArticleTagLink, UserArticleLink
+from models import ArticleImport
+from typeahead import normalize_key
+from typing import Iterable, Iterator, List, Tuple
+import argparse
+import csv
+import json
+import os
+from io import StringIO
+
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "1000"))
+INGEST_FORMATS = ["ndjson", "csv"]
+
+def parse_ndjson(lines: Iterable[str]) -> Iterator[Tuple[int, object]]:
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as error:
+            yield number, error
+
+def parse_csv(lines: Iterable[str]) -> Iterator[Tuple[int, object]]:
+    for number, row in enumerate(csv.DictReader(lines), start=1):
+        yield number, row
+
+def parse_rows(lines: Iterable[str], ingest_format: str) -> Iterator[Tuple[int, object]]:
+    if ingest_format == "csv":
+        return parse_csv(lines)
+    return parse_ndjson(lines)
+
+def resolve_names(session: Session, model, names: set) -> dict:
+    # Existing rows are matched with one IN query, the rest are created with
+    # one executemany INSERT ... RETURNING.
+    if not names:
+        return {}
+    ids = {}
+    for row_id, name in session.exec(select(model.id, model.name).where(model.name.in_(names)).order_by(model.id)):
+        ids.setdefault(name, row_id)
+    missing = sorted(names - ids.keys())
+    if missing:
+        statement = insert(model).returning(model.id, model.name, sort_by_parameter_order=True)
+        for row_id, name in session.exec(statement, params=[{"name": name, "name_key": normalize_key(name)} for name in missing]):
+            ids[name] = row_id
+    return ids
+
+def insert_chunk(session: Session, articles: List[ArticleImport], user_id: int):
+    author_ids = resolve_names(session, Author, {name for article in articles for name in article.authors})
+    tag_ids = resolve_names(session, Tag, {name for article in articles for name in article.tags})
+
+    statement = insert(Article).returning(Article.id, sort_by_parameter_order=True)
+    rows = [{"title": article.title,
+             "abstract": article.abstract,
+             "publication_date": article.publication_date} for article in articles]
+    article_ids = list(session.exec(statement, params=rows).scalars())
+
+    author_links = [{"article_id": article_id, "author_id": author_id}
+                    for article_id, article in zip(article_ids, articles)
+                    for author_id in {author_ids[name] for name in article.authors}]
+    tag_links = [{"article_id": article_id, "tag_id": tag_id}
+                 for article_id, article in zip(article_ids, articles)
+                 for tag_id in {tag_ids[name] for name in article.tags}]
+    user_links = [{"user_id": user_id, "article_id": article_id} for article_id in article_ids]
+    for link_model, links in ((ArticleAuthorLink, author_links), (ArticleTagLink, tag_links), (UserArticleLink, user_links)):
+        if links:
+            session.exec(insert(link_model), params=links)
+
+def ingest_rows(session: Session,
+                rows: Iterable[Tuple[int, object]],
+                user_id: int,
+                chunk_size: int = INGEST_CHUNK_SIZE) -> dict:
+    # Each chunk is its own transaction; invalid rows are reported and
+    # skipped, and a failing chunk is reported for every row in it.
+    report = {"inserted": 0, "errors": []}
+    chunk = []
+
+    def flush():
+        try:
+            insert_chunk(session, [article for _, article in chunk], user_id)
+            session.commit()
+            report["inserted"] += len(chunk)
+        except Exception as error:
+            session.rollback()
+            report["errors"].extend({"row": number, "error": f"Chunk failed: {error}"} for number, _ in chunk)
+        chunk.clear()
+
+    for number, row in rows:
+        if isinstance(row, Exception):
+            report["errors"].append({"row": number, "error": f"Invalid JSON: {row}"})
+            continue
+        try:
+            chunk.append((number, ArticleImport.model_validate(row)))
+        except ValidationError as error:
+            report["errors"].append({"row": number, "error": "; ".join(
+                f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}" for detail in error.errors())})
+            continue
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return report
+
+def ingest_text(engine, text: str, ingest_format: str, user_id: int) -> dict:
+    with Session(engine) as session:
+        return ingest_rows(session, parse_rows(StringIO(text), ingest_format), user_id)
+
+def main():
+    from database import engine, init_db
+    from cache import response_cache
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Load articles from an NDJSON or CSV file.")
+    parser.add_argument("path")
+    parser.add_argument("--username", required=True, help="User that the articles are added for.")
+    parser.add_argument("--format", choices=INGEST_FORMATS, help="Defaults to the file extension.")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE)
+    args = parser.parse_args()
+    ingest_format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+
+    init_db()
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.username == args.username)).first()
+        if not user:
+            parser.error(f"User {args.username} was not found.")
+        with open(args.path, newline="", encoding="utf-8") as file:
+            report = ingest_rows(session, parse_rows(file, ingest_format), user.id, args.chunk_size)
+    if report["inserted"]:
+        # Invalidates the servers' cached responses and ETags when the
+        # response cache is shared (RESPONSE_CACHE_URL).
+        asyncio.run(response_cache.bump(articles=True))
+    for error in report["errors"]:
+        print(f"row {error['row']}: {error['error']}")
+    print(f"{report['inserted']} articles inserted, {len(report['errors'])} rows rejected.")
+
+if __name__ == "__main__":
+    main()
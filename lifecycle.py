@@ -0,0 +1,91 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from contextlib import contextmanager
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+import asyncio
+import logging
+import os
+import time
+
+# Comma separated GET paths requested once per worker before it reports
+# ready, so the first real requests find compiled statements, warm
+# connections and a filled response cache.
+WARMUP_PATHS = os.getenv("WARMUP_PATHS", "/articles/get_tags,/articles/get_authors,"
+                                         "/articles/get_filtered_articles,/articles/get_facets")
+READY_CHECK_TIMEOUT = float(os.getenv("READY_CHECK_TIMEOUT", "2"))
+
+logger = logging.getLogger("app.startup")
+
+router = APIRouter(tags=["health"])
+
+# Seconds per startup step in the order they ran. serve.py adds the import
+# time, which a preloaded app spends once in the parent process.
+timings = {}
+ready = False
+database_engine = None
+
+@contextmanager
+def timed(step: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[step] = timings.get(step, 0.0) + time.perf_counter() - started
+
+async def request(app, path: str) -> int:
+    # A bare ASGI GET through the whole middleware and routing stack.
+    path, _, query = path.partition("?")
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": query.encode(), "headers": [(b"host", b"warmup")],
+             "client": ("127.0.0.1", 0), "server": ("warmup", 80)}
+    response = {"status": 500}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+
+    await app(scope, receive, send)
+    return response["status"]
+
+async def warm_up(app):
+    for path in filter(None, (path.strip() for path in WARMUP_PATHS.split(","))):
+        status_code = await request(app, path)
+        if status_code >= 400:
+            logger.warning("warmup request failed", extra={"path": path, "status": status_code})
+
+def report():
+    breakdown = {f"{step}_ms": round(seconds * 1000, 1) for step, seconds in timings.items()}
+    logger.info("startup complete", extra={"pid": os.getpid(),
+                                           "total_ms": round(sum(timings.values()) * 1000, 1),
+                                           **breakdown})
+
+@router.get("/healthz")
+async def healthz():
+    # Liveness: the process is up and its event loop answers.
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz():
+    # Readiness: startup and warmup are done and the database answers.
+    if not ready or database_engine is None:
+        return JSONResponse({"status": "starting"}, status_code=503)
+
+    async def ping():
+        async with database_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(ping(), READY_CHECK_TIMEOUT)
+    except Exception as error:
+        return JSONResponse({"status": "unavailable", "error": str(error)}, status_code=503)
+    return {"status": "ok"}
+
+def set_ready(value: bool, engine: AsyncEngine = None):
+    global ready, database_engine
+    ready = value
+    database_engine = engine
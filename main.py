@@ -1,19 +1,71 @@
 import uvicorn
-from sqlmodel import SQLModel, create_engine
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from database import engine, async_engine
+from schema import check_schema, load_optional_features
+from cache import response_cache
+from logs import configure_logging
 import auth
 import articles
+import export_jobs
 import comments
+import metrics
+import lifecycle
 from sample_data import add_sample_data
 
-engine = create_engine("sqlite:///./test.db")
-SQLModel.metadata.create_all(engine)
+configure_logging()
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
 
-app = FastAPI()
+def cache_samples() -> list:
+    samples = []
+    caches = {"token": auth.token_cache.stats(),
+              "user": auth.user_cache.stats(),
+              "response": response_cache.stats()}
+    for name, stats in caches.items():
+        labels = {"cache": name}
+        samples.append(("cache_hits_total", "counter", "Cache lookups that found an entry.", labels, stats["hits"]))
+        samples.append(("cache_misses_total", "counter", "Cache lookups that found no entry.", labels, stats["misses"]))
+        if "size" in stats:
+            samples.append(("cache_entries", "gauge", "Entries currently cached.", labels, stats["size"]))
+    samples.append(("cache_not_modified_total", "counter", "Requests answered with 304 Not Modified.",
+                    {"cache": "response"}, caches["response"]["not_modified"]))
+    return samples
+
+metrics.collectors.append(cache_samples)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in every worker. Pools inherited from a preloading parent hold
+    # connections that parent and siblings share after the fork, so each
+    # worker drops them, without closing them, and opens its own.
+    with lifecycle.timed("engines"):
+        engine.dispose(close=False)
+        await async_engine.dispose(close=False)
+    with lifecycle.timed("schema_check"):
+        check_schema(engine)
+    with lifecycle.timed("optional_features"):
+        load_optional_features(engine)
+    with lifecycle.timed("exports"):
+        await run_in_threadpool(export_jobs.prepare, await response_cache.version("articles"), response_cache.shared)
+    with lifecycle.timed("warmup"):
+        await lifecycle.warm_up(app)
+    lifecycle.set_ready(True, async_engine)
+    lifecycle.report()
+    yield
+    lifecycle.set_ready(False)
+    await async_engine.dispose()
+    engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
 app.include_router(auth.router)
 app.include_router(articles.router)
 app.include_router(comments.router)
+app.include_router(metrics.router)
+app.include_router(lifecycle.router)
 #add_sample_data()
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
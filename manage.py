@@ -0,0 +1,43 @@
+from alembic import command
+from database import engine
+from schema import alembic_config, upgrade, current_revision, head_revision
+import argparse
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the database schema.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="Migrate the database to a newer revision.")
+    upgrade_parser.add_argument("revision", nargs="?", default="head")
+    upgrade_parser.add_argument("--sql", action="store_true", help="Print the SQL instead of running it.")
+    downgrade_parser = commands.add_parser("downgrade", help="Migrate the database to an older revision.")
+    downgrade_parser.add_argument("revision")
+    commands.add_parser("current", help="Show the database and application revisions.")
+    commands.add_parser("history", help="List the migrations.")
+    revision_parser = commands.add_parser("revision", help="Create a new migration.")
+    revision_parser.add_argument("-m", "--message", required=True)
+    revision_parser.add_argument("--autogenerate", action="store_true",
+                                 help="Fill the migration from the differences between tables.py and the database.")
+    stamp_parser = commands.add_parser("stamp", help="Record a revision without running migrations.")
+    stamp_parser.add_argument("revision")
+    args = parser.parse_args()
+
+    config = alembic_config(engine)
+    if args.command == "upgrade" and args.sql:
+        command.upgrade(config, args.revision, sql=True)
+    elif args.command == "upgrade":
+        upgrade(engine, args.revision)
+        print(f"Database at revision {current_revision(engine)}.")
+    elif args.command == "downgrade":
+        command.downgrade(config, args.revision)
+        print(f"Database at revision {current_revision(engine)}.")
+    elif args.command == "current":
+        print(f"database: {current_revision(engine)}, application: {head_revision()}")
+    elif args.command == "history":
+        command.history(config)
+    elif args.command == "revision":
+        command.revision(config, message=args.message, autogenerate=args.autogenerate)
+    elif args.command == "stamp":
+        command.stamp(config, args.revision)
+
+if __name__ == "__main__":
+    main()
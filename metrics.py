@@ -0,0 +1,209 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from contextvars import ContextVar
+from threading import Lock
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import bisect
+import logging
+import os
+import re
+import time
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+# Longest repr of a single bound parameter in the slow query log.
+LOG_PARAMETER_LENGTH = 200
+# Statements on the user table bind usernames and password hashes, so only
+# the types and lengths of their parameters are logged.
+REDACTED_STATEMENT = re.compile(r'\b(?:FROM|INTO|UPDATE|JOIN)\s+"?user"?(?!\w)', re.IGNORECASE)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+logger = logging.getLogger("app.metrics")
+
+router = APIRouter(tags=["metrics"])
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values = {}
+        self.lock = Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Per label set: a count per bucket (the last one is +Inf), the sum and the count.
+        self.values = {}
+        self.lock = Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts, total, count = self.values.get(key) or ([0] * (len(self.buckets) + 1), 0, 0)
+            counts[index] += 1
+            self.values[key] = (counts, total + value, count + 1)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    labels = format_labels(self.labelnames + ("le",), key + (str(bound),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{format_labels(self.labelnames, key)} {count}")
+        return lines
+
+def format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    escaped = [str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+REQUESTS = Counter("http_requests_total", "Requests handled.", ("method", "route", "status"))
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Time from request to the end of the response body.",
+                            ("method", "route"), LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram("http_response_size_bytes", "Response body size.", ("method", "route"), SIZE_BUCKETS)
+REQUEST_STATEMENTS = Histogram("db_statements_per_request", "SQL statements run for one request.",
+                               ("method", "route"), STATEMENT_BUCKETS)
+REQUEST_DB_TIME = Histogram("db_time_per_request_seconds", "Time spent executing SQL for one request.",
+                            ("method", "route"), LATENCY_BUCKETS)
+STATEMENTS = Counter("db_statements_total", "SQL statements executed.")
+SLOW_QUERIES = Counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS.")
+METRICS = [REQUESTS, REQUEST_LATENCY, RESPONSE_SIZE, REQUEST_STATEMENTS, REQUEST_DB_TIME, STATEMENTS, SLOW_QUERIES]
+
+# Functions read at scrape time, e.g. for cache stats. Each returns a list of
+# (name, type, help, labels, value) samples.
+collectors = []
+
+class RequestStats:
+    def __init__(self, route: str):
+        self.route = route
+        self.statements = 0
+        self.db_time = 0.0
+
+# Holds a mutable object, so statements run in threadpool workers and
+# greenlets that copied the request's context still add to its totals.
+current_request = ContextVar("current_request", default=None)
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's execution context, not the pooled connection:
+    # after_cursor_execute never runs for a statement that raised.
+    context.query_start = time.perf_counter()
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.query_start
+    STATEMENTS.inc()
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc()
+        logger.warning("slow query", extra={"duration_ms": round(elapsed * 1000, 2),
+                                            "route": stats.route if stats else None,
+                                            "statement": statement,
+                                            "parameters": loggable_parameters(statement, parameters, executemany)})
+
+def redacted(value) -> str:
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__} of length {len(value)}>"
+    return f"<{type(value).__name__}>"
+
+def loggable_parameters(statement: str, parameters, executemany: bool):
+    if executemany:
+        return f"{len(parameters)} parameter sets"
+    describe = redacted if REDACTED_STATEMENT.search(statement) else lambda value: repr(value)[:LOG_PARAMETER_LENGTH]
+    if isinstance(parameters, dict):
+        return {key: describe(value) for key, value in parameters.items()}
+    return [describe(value) for value in parameters or ()]
+
+def instrument_engine(engine: Engine):
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+class MetricsMiddleware:
+    # Plain ASGI middleware: the timing and size cover streamed bodies to
+    # their last chunk, which BaseHTTPMiddleware would not.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        stats = RequestStats(scope["path"])
+        token = current_request.set(stats)
+        response = {"status": 500, "size": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["size"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            elapsed = time.perf_counter() - started
+            # The matched route template keeps label cardinality bounded.
+            route = scope["route"].path if "route" in scope else "unmatched"
+            stats.route = route
+            method = scope["method"]
+            REQUESTS.inc(method=method, route=route, status=str(response["status"]))
+            REQUEST_LATENCY.observe(elapsed, method=method, route=route)
+            RESPONSE_SIZE.observe(response["size"], method=method, route=route)
+            REQUEST_STATEMENTS.observe(stats.statements, method=method, route=route)
+            REQUEST_DB_TIME.observe(stats.db_time, method=method, route=route)
+            if elapsed * 1000 >= SLOW_REQUEST_MS:
+                logger.warning("slow request", extra={"method": method,
+                                                      "route": route,
+                                                      "status": response["status"],
+                                                      "duration_ms": round(elapsed * 1000, 2),
+                                                      "statements": stats.statements,
+                                                      "db_time_ms": round(stats.db_time * 1000, 2),
+                                                      "response_bytes": response["size"]})
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    # Samples of one metric have to be contiguous in the exposition format.
+    families = {}
+    for collector in collectors:
+        for name, metric_type, help, labels, value in collector():
+            family = families.setdefault(name, [f"# HELP {name} {help}", f"# TYPE {name} {metric_type}"])
+            family.append(f"{name}{format_labels(tuple(labels), tuple(labels.values()))} {value}")
+    for family in families.values():
+        lines.extend(family)
+    return "\n".join(lines) + "\n"
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
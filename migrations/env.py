@@ -0,0 +1,44 @@
+from alembic import context
+from sqlmodel import SQLModel
+# Importing the models registers their tables on SQLModel.metadata.
+import tables
+
+config = context.config
+target_metadata = SQLModel.metadata
+# Tables created with raw SQL in migrations, not declared in tables.py.
+UNMANAGED_TABLES = ("article_fts", "facet_count")
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table" and reflected and compare_to is None:
+        return not name.startswith(UNMANAGED_TABLES)
+    return True
+
+def run_migrations_offline():
+    from database import DATABASE_URL
+    context.configure(url=DATABASE_URL,
+                      target_metadata=target_metadata,
+                      literal_binds=True,
+                      render_as_batch=True,
+                      include_object=include_object)
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    # schema.upgrade() passes the engine it migrates; the manage.py commands
+    # use the application's engine.
+    engine = config.attributes.get("engine")
+    if engine is None:
+        from database import engine
+    with engine.connect() as connection:
+        # Batch mode lets ALTER operations SQLite lacks rebuild the table.
+        context.configure(connection=connection,
+                          target_metadata=target_metadata,
+                          render_as_batch=True,
+                          include_object=include_object)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
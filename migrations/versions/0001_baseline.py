@@ -0,0 +1,50 @@
+"""baseline schema
+
+Revision ID: 0001
+Revises:
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def link_table(name: str, first: str, second: str):
+    op.create_table(name,
+                    sa.Column(f"{first}_id", sa.Integer(), sa.ForeignKey(f"{first}.id"), nullable=False),
+                    sa.Column(f"{second}_id", sa.Integer(), sa.ForeignKey(f"{second}.id"), nullable=False),
+                    sa.PrimaryKeyConstraint(f"{first}_id", f"{second}_id"))
+
+def upgrade():
+    op.create_table("user",
+                    sa.Column("id", sa.Integer(), nullable=False),
+                    sa.Column("username", sa.String(), nullable=False),
+                    sa.Column("hashed_password", sa.String(), nullable=False),
+                    sa.PrimaryKeyConstraint("id"),
+                    sa.UniqueConstraint("username"))
+    op.create_index("ix_user_id", "user", ["id"])
+    op.create_table("article",
+                    sa.Column("id", sa.Integer(), nullable=False),
+                    sa.Column("title", sa.String(), nullable=False),
+                    sa.Column("abstract", sa.String(), nullable=False),
+                    sa.Column("publication_date", sa.Date(), nullable=True),
+                    sa.PrimaryKeyConstraint("id"))
+    for name, column in (("author", "name"), ("tag", "name"), ("comment", "content")):
+        op.create_table(name,
+                        sa.Column("id", sa.Integer(), nullable=False),
+                        sa.Column(column, sa.String(), nullable=False),
+                        sa.PrimaryKeyConstraint("id"))
+    link_table("userarticlelink", "user", "article")
+    link_table("usercommentlink", "user", "comment")
+    link_table("articleauthorlink", "article", "author")
+    link_table("articletaglink", "article", "tag")
+    link_table("articlecommentlink", "article", "comment")
+
+def downgrade():
+    for name in ("articlecommentlink", "articletaglink", "articleauthorlink", "usercommentlink",
+                 "userarticlelink", "comment", "tag", "author", "article"):
+        op.drop_table(name)
+    op.drop_index("ix_user_id", table_name="user")
+    op.drop_table("user")
@@ -0,0 +1,28 @@
+"""indexes for the article filters and reverse link lookups
+
+Revision ID: 0002
+Revises: 0001
+"""
+from schema import create_index_online, drop_index_online
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [("ix_article_publication_date", "article", ["publication_date"]),
+           ("ix_author_name", "author", ["name"]),
+           ("ix_tag_name", "tag", ["name"]),
+           ("ix_userarticlelink_article_id", "userarticlelink", ["article_id"]),
+           ("ix_usercommentlink_comment_id", "usercommentlink", ["comment_id"]),
+           ("ix_articleauthorlink_author_id", "articleauthorlink", ["author_id"]),
+           ("ix_articletaglink_tag_id", "articletaglink", ["tag_id"]),
+           ("ix_articlecommentlink_comment_id", "articlecommentlink", ["comment_id"])]
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        create_index_online(name, table, columns)
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        drop_index_online(name, table)
@@ -0,0 +1,72 @@
+"""full text index for keyword filters (SQLite only)
+
+Revision ID: 0003
+Revises: 0002
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# The trigram tokenizer matches arbitrary substrings, which keeps the
+# results identical to the old ilike('%kw%') filter for keywords of 3+ chars.
+CREATE_ARTICLE_FTS = """
+CREATE VIRTUAL TABLE article_fts USING fts5(
+    title, abstract,
+    content='article', content_rowid='id',
+    tokenize='trigram'
+)
+"""
+
+ARTICLE_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS article_fts_ai AFTER INSERT ON article BEGIN
+        INSERT INTO article_fts(rowid, title, abstract)
+        VALUES (new.id, new.title, new.abstract);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS article_fts_ad AFTER DELETE ON article BEGIN
+        INSERT INTO article_fts(article_fts, rowid, title, abstract)
+        VALUES ('delete', old.id, old.title, old.abstract);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS article_fts_au AFTER UPDATE OF title, abstract ON article BEGIN
+        INSERT INTO article_fts(article_fts, rowid, title, abstract)
+        VALUES ('delete', old.id, old.title, old.abstract);
+        INSERT INTO article_fts(rowid, title, abstract)
+        VALUES (new.id, new.title, new.abstract);
+    END
+    """,
+]
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+    # Offline scripts can't inspect the database or recover from a failed
+    # statement; they create the index unconditionally.
+    if op.get_context().as_sql:
+        op.execute(CREATE_ARTICLE_FTS)
+        op.execute("INSERT INTO article_fts(article_fts) VALUES ('rebuild')")
+    elif not inspect(bind).has_table("article_fts"):
+        try:
+            op.execute(CREATE_ARTICLE_FTS)
+        except Exception:
+            # SQLite built without FTS5 or the trigram tokenizer (< 3.34);
+            # keyword filters keep working through ilike alone.
+            return
+        op.execute("INSERT INTO article_fts(article_fts) VALUES ('rebuild')")
+    for trigger in ARTICLE_FTS_TRIGGERS:
+        op.execute(trigger)
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for suffix in ("ai", "ad", "au"):
+        op.execute(f"DROP TRIGGER IF EXISTS article_fts_{suffix}")
+    op.execute("DROP TABLE IF EXISTS article_fts")
@@ -0,0 +1,29 @@
+"""denormalized comment count per article
+
+Revision ID: 0004
+Revises: 0003
+"""
+from alembic import op
+from sqlalchemy import inspect
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if not op.get_context().as_sql:
+        columns = {column["name"] for column in inspect(op.get_bind()).get_columns("article")}
+        if "comment_count" in columns:
+            return
+    op.add_column("article", sa.Column("comment_count", sa.Integer(), nullable=False, server_default="0"))
+    op.execute("UPDATE article SET comment_count = "
+               "(SELECT count(*) FROM articlecommentlink WHERE articlecommentlink.article_id = article.id)")
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        # A batch rebuild of article would drop its FTS and facet triggers.
+        op.execute("ALTER TABLE article DROP COLUMN comment_count")
+    else:
+        op.drop_column("article", "comment_count")
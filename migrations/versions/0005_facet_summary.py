@@ -0,0 +1,119 @@
+"""facet count summary maintained by triggers (SQLite only)
+
+Revision ID: 0005
+Revises: 0004
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Article counts per author, tag and publication month for the whole table,
+# kept current by triggers so the unfiltered facets need no grouped query.
+CREATE_FACET_SUMMARY = """
+CREATE TABLE facet_count (
+    facet TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (facet, value)
+)
+"""
+
+FILL_FACET_SUMMARY = [
+    """
+    INSERT INTO facet_count(facet, value, count)
+    SELECT 'authors', author_id, count(*) FROM articleauthorlink GROUP BY author_id
+    """,
+    """
+    INSERT INTO facet_count(facet, value, count)
+    SELECT 'tags', tag_id, count(*) FROM articletaglink GROUP BY tag_id
+    """,
+    """
+    INSERT INTO facet_count(facet, value, count)
+    SELECT 'months', strftime('%Y-%m', publication_date), count(*) FROM article
+    WHERE publication_date IS NOT NULL GROUP BY strftime('%Y-%m', publication_date)
+    """,
+]
+
+def increment(facet: str, value: str) -> str:
+    return f"""
+        INSERT INTO facet_count(facet, value, count) VALUES ('{facet}', {value}, 1)
+        ON CONFLICT(facet, value) DO UPDATE SET count = count + 1;"""
+
+def decrement(facet: str, value: str) -> str:
+    return f"""
+        UPDATE facet_count SET count = count - 1 WHERE facet = '{facet}' AND value = {value};"""
+
+NEW_MONTH = "strftime('%Y-%m', new.publication_date)"
+OLD_MONTH = "strftime('%Y-%m', old.publication_date)"
+
+FACET_SUMMARY_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS facet_count_author_ai AFTER INSERT ON articleauthorlink BEGIN
+        {increment('authors', 'new.author_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS facet_count_author_ad AFTER DELETE ON articleauthorlink BEGIN
+        {decrement('authors', 'old.author_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS facet_count_tag_ai AFTER INSERT ON articletaglink BEGIN
+        {increment('tags', 'new.tag_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS facet_count_tag_ad AFTER DELETE ON articletaglink BEGIN
+        {decrement('tags', 'old.tag_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS facet_count_month_ai AFTER INSERT ON article
+    WHEN new.publication_date IS NOT NULL BEGIN
+        {increment('months', NEW_MONTH)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS facet_count_month_ad AFTER DELETE ON article
+    WHEN old.publication_date IS NOT NULL BEGIN
+        {decrement('months', OLD_MONTH)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS facet_count_month_old_au AFTER UPDATE OF publication_date ON article
+    WHEN old.publication_date IS NOT NULL BEGIN
+        {decrement('months', OLD_MONTH)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS facet_count_month_new_au AFTER UPDATE OF publication_date ON article
+    WHEN new.publication_date IS NOT NULL BEGIN
+        {increment('months', NEW_MONTH)}
+    END
+    """,
+]
+
+TRIGGER_NAMES = ["author_ai", "author_ad", "tag_ai", "tag_ad",
+                 "month_ai", "month_ad", "month_old_au", "month_new_au"]
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+    if op.get_context().as_sql or not inspect(bind).has_table("facet_count"):
+        op.execute(CREATE_FACET_SUMMARY)
+        for statement in FILL_FACET_SUMMARY:
+            op.execute(statement)
+    for trigger in FACET_SUMMARY_TRIGGERS:
+        op.execute(trigger)
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for name in TRIGGER_NAMES:
+        op.execute(f"DROP TRIGGER IF EXISTS facet_count_{name}")
+    op.execute("DROP TABLE IF EXISTS facet_count")
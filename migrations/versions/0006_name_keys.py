@@ -0,0 +1,48 @@
+"""normalized author and tag names for typeahead prefix search
+
+Revision ID: 0006
+Revises: 0005
+"""
+from alembic import op
+from schema import create_index_online, drop_index_online
+import sqlalchemy as sa
+import unicodedata
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+TABLES = ["author", "tag"]
+BACKFILL_CHUNK_SIZE = 1000
+
+def normalize_key(name: str) -> str:
+    # Frozen copy of typeahead.normalize_key as of this revision.
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+def upgrade():
+    connection = op.get_bind()
+    for table in TABLES:
+        op.add_column(table, sa.Column("name_key", sa.String(), nullable=False, server_default=""))
+        names = sa.table(table, sa.column("id", sa.Integer), sa.column("name", sa.String),
+                         sa.column("name_key", sa.String))
+        if op.get_context().as_sql:
+            # Offline scripts can't run Python over the rows. lower() folds
+            # ASCII only, so non-ASCII names may miss casefolded prefixes.
+            op.execute(sa.update(names).values(name_key=sa.func.lower(sa.func.trim(names.c.name))))
+            create_index_online(f"ix_{table}_name_key", table, ["name_key"])
+            continue
+        # Casefolding and NFKC have no SQL equivalent, so the keys are
+        # computed here and written back in chunks.
+        rows = connection.execute(sa.select(names.c.id, names.c.name)).all()
+        statement = sa.update(names).where(names.c.id == sa.bindparam("row_id")).values(name_key=sa.bindparam("key"))
+        for start in range(0, len(rows), BACKFILL_CHUNK_SIZE):
+            connection.execute(statement, [{"row_id": row_id, "key": normalize_key(name)}
+                                           for row_id, name in rows[start:start + BACKFILL_CHUNK_SIZE]])
+        create_index_online(f"ix_{table}_name_key", table, ["name_key"])
+
+def downgrade():
+    for table in reversed(TABLES):
+        drop_index_online(f"ix_{table}_name_key", table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("name_key")
@@ -0,0 +1,26 @@
+"""facet count summary index for the top authors and tags (SQLite only)
+
+Revision ID: 0007
+Revises: 0006
+"""
+from alembic import op
+from schema import create_index_online, drop_index_online
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# Walked backwards per facet, so the most used authors and tags are read
+# first and the landing page stops after its limit.
+INDEX = ("ix_facet_count_facet_count", "facet_count", ["facet", "count"])
+
+def upgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    create_index_online(*INDEX)
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    drop_index_online(*INDEX[:2])
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, field_validator
+from typing import List, Optional
 from datetime import date
 
 class AuthorCreate(BaseModel):
@@ -29,6 +29,84 @@ class ArticleUpdate(BaseModel):
     authors: List[int]
     tags: List[int]
 
+class AuthorRead(BaseModel):
+    id: int
+    name: str
+
+class TagRead(BaseModel):
+    id: int
+    name: str
+
+class NameMatch(BaseModel):
+    id: int
+    name: str
+    article_count: int
+
+class ArticleRead(BaseModel):
+    id: int
+    title: str
+    abstract: str
+    publication_date: Optional[date]
+    authors: List[AuthorRead]
+    tags: List[TagRead]
+    comment_count: int
+
+class FacetCount(BaseModel):
+    id: int
+    name: str
+    count: int
+
+class YearCount(BaseModel):
+    year: int
+    count: int
+
+class MonthCount(BaseModel):
+    year: int
+    month: int
+    count: int
+
+class Facets(BaseModel):
+    authors: List[FacetCount]
+    tags: List[FacetCount]
+    years: List[YearCount]
+    months: List[MonthCount]
+
+class ArticleImport(BaseModel):
+    title: str
+    abstract: str
+    publication_date: Optional[date] = None
+    authors: List[str] = []
+    tags: List[str] = []
+
+    @field_validator("publication_date", mode="before")
+    @classmethod
+    def empty_date(cls, value):
+        return value or None
+
+    @field_validator("authors", "tags", mode="before")
+    @classmethod
+    def split_names(cls, value):
+        # CSV cells hold "; "-separated names, as written by the exports.
+        if isinstance(value, str):
+            value = value.split(";")
+        return [name.strip() for name in value or [] if name and name.strip()]
+
+class IngestError(BaseModel):
+    row: int
+    error: str
+
+class IngestReport(BaseModel):
+    inserted: int
+    errors: List[IngestError]
+
+class ExportJobStatus(BaseModel):
+    id: str
+    status: str
+    format: str
+    compression: Optional[str]
+    size: Optional[int]
+    error: Optional[str]
+
 class ArticleDelete(BaseModel):
     article_id: int
 
@@ -1,50 +1,127 @@
-from sqlmodel import Session, create_engine
-from tables import User, Author, Article, Tag
-from datetime import date
+from sqlmodel import Session, select
+from sqlalchemy import insert, update, func
+from database import engine, init_db
+from cache import response_cache
+from tables import User, Article, Comment, ArticleCommentLink, UserCommentLink
+from ingest import INGEST_CHUNK_SIZE, ingest_rows
+from datetime import date, timedelta
+from typing import Iterator, Tuple
+import argparse
+import asyncio
+import random
 
-engine = create_engine("sqlite:///./test.db")
+WORDS = ["quantum", "neural", "climate", "protein", "graph", "market", "energy", "vision",
+         "language", "genome", "network", "ocean", "policy", "sensor", "galaxy", "vaccine"]
 
-def add_sample_data():
-    with Session(engine) as session:
-        # Add users
-        user1 = User(username="user1", hashed_password="password1")
-        user2 = User(username="user2", hashed_password="password2")
-        
-        session.add_all([user1, user2])
-        session.commit()
+def pick(generator: random.Random, count: int, skew: float) -> int:
+    # With a skew above 0 low numbers are picked far more often, like the few
+    # prolific authors, popular tags and hot articles of a real catalogue.
+    if not skew:
+        return generator.randrange(count)
+    return int(count * generator.random() ** (1 + skew))
 
-        # Add authors
-        author1 = Author(name="Author One")
-        author2 = Author(name="Author Two")
-        
-        session.add_all([author1, author2])
-        session.commit()
+def generate_articles(count: int,
+                      author_count: int,
+                      tag_count: int,
+                      authors_per_article: int = 1,
+                      tags_per_article: int = 1,
+                      seed: int = 0,
+                      skew: float = 0.0) -> Iterator[Tuple[int, dict]]:
+    # Deterministic for a given seed, so datasets can be rebuilt exactly.
+    generator = random.Random(seed)
+    first_day = date(2000, 1, 1)
+    for number in range(1, count + 1):
+        words = generator.sample(WORDS, 3)
+        yield number, {
+            "title": f"Article {number}: {' '.join(words[:2])}",
+            "abstract": f"Abstract of Article {number} about {' and '.join(words)}.",
+            "publication_date": first_day + timedelta(days=generator.randrange(365 * 25)),
+            "authors": [f"Author {pick(generator, author_count, skew) + 1}"
+                        for _ in range(min(authors_per_article, author_count))],
+            "tags": [f"Tag {pick(generator, tag_count, skew) + 1}"
+                     for _ in range(min(tags_per_article, tag_count))],
+        }
 
-        # Add tags
-        tag1 = Tag(name="Technology")
-        tag2 = Tag(name="Health")
-        
-        session.add_all([tag1, tag2])
-        session.commit()
+def get_or_create_users(session: Session, usernames: list) -> list:
+    users = []
+    for username in usernames:
+        user = session.exec(select(User).where(User.username == username)).first()
+        if not user:
+            user = User(username=username, hashed_password=f"password{len(users) + 1}")
+            session.add(user)
+            session.commit()
+        users.append(user)
+    return users
 
-        # Add articles and associate with users, authors, and tags
-        article1 = Article(
-            title="Article 1",
-            abstract="Abstract of Article 1",
-            publication_date=date(2023, 1, 1),
-            user=user1,
-            authors=[author1],
-            tags=[tag1]
-        )
-        article2 = Article(
-            title="Article 2",
-            abstract="Abstract of Article 2",
-            publication_date=date(2023, 2, 1),
-            user=user2,
-            authors=[author2],
-            tags=[tag2]
-        )
-
-        session.add_all([article1, article2])
+def add_comments(session: Session,
+                 user_ids: list,
+                 comments_per_article: float,
+                 skew: float = 0.0,
+                 seed: int = 0,
+                 chunk_size: int = INGEST_CHUNK_SIZE) -> int:
+    # Comments go to the articles already in the database, in chunks of
+    # executemany inserts like the article ingestion.
+    first_id, last_id = session.exec(select(func.min(Article.id), func.max(Article.id))).one()
+    if first_id is None:
+        return 0
+    generator = random.Random(seed)
+    total = int((last_id - first_id + 1) * comments_per_article)
+    statement = insert(Comment).returning(Comment.id, sort_by_parameter_order=True)
+    for start in range(0, total, chunk_size):
+        numbers = range(start + 1, min(start + chunk_size, total) + 1)
+        comment_ids = list(session.exec(statement, params=[{"content": f"Comment {number}"} for number in numbers]).scalars())
+        session.exec(insert(ArticleCommentLink),
+                     params=[{"article_id": first_id + pick(generator, last_id - first_id + 1, skew), "comment_id": comment_id}
+                             for comment_id in comment_ids])
+        session.exec(insert(UserCommentLink),
+                     params=[{"user_id": user_ids[comment_id % len(user_ids)], "comment_id": comment_id}
+                             for comment_id in comment_ids])
         session.commit()
+    counts = select(func.count())\
+                .where(ArticleCommentLink.article_id == Article.id)\
+                .scalar_subquery()
+    session.exec(update(Article).values(comment_count=counts))
+    session.commit()
+    return total
+
+def add_sample_data(articles: int = 2,
+                    authors: int = 2,
+                    tags: int = 2,
+                    authors_per_article: int = 1,
+                    tags_per_article: int = 1,
+                    seed: int = 0,
+                    comments_per_article: float = 0.0,
+                    skew: float = 0.0) -> dict:
+    with Session(engine) as session:
+        users = get_or_create_users(session, ["user1", "user2"])
+        report = {"inserted": 0, "errors": [], "comments": 0}
+        # Articles are shared out between the users round robin.
+        for index, user in enumerate(users):
+            rows = generate_articles(articles, authors, tags, authors_per_article, tags_per_article, seed, skew)
+            own_rows = (row for row in rows if (row[0] - 1) % len(users) == index)
+            user_report = ingest_rows(session, own_rows, user.id)
+            report["inserted"] += user_report["inserted"]
+            report["errors"] += user_report["errors"]
+        if comments_per_article:
+            report["comments"] = add_comments(session, [user.id for user in users], comments_per_article, skew, seed)
+        return report
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add a synthetic dataset to the database.")
+    parser.add_argument("--articles", type=int, default=2)
+    parser.add_argument("--authors", type=int, default=2)
+    parser.add_argument("--tags", type=int, default=2)
+    parser.add_argument("--authors-per-article", type=int, default=1)
+    parser.add_argument("--tags-per-article", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--comments-per-article", type=float, default=0.0)
+    parser.add_argument("--skew", type=float, default=0.0,
+                        help="Above 0, a few authors, tags and articles get most of the links and comments.")
+    args = parser.parse_args()
+    init_db()
+    report = add_sample_data(args.articles, args.authors, args.tags,
+                             args.authors_per_article, args.tags_per_article, args.seed,
+                             args.comments_per_article, args.skew)
+    # As in ingest.py: shared response caches see the new articles at once.
+    asyncio.run(response_cache.bump(articles=True))
+    print(f"{report['inserted']} articles and {report['comments']} comments inserted.")
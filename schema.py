@@ -0,0 +1,79 @@
+from alembic import command, op
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from search import load_search_index
+from facets import load_facet_summary
+from typeahead import load_prefix_indexes
+from typing import List, Optional
+import os
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+# The schema every database had before migrations were introduced.
+BASELINE_REVISION = "0001"
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+def alembic_config(engine: Engine = None) -> Config:
+    config = Config(ALEMBIC_INI)
+    if engine is not None:
+        config.attributes["engine"] = engine
+    return config
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+def current_revision(engine: Engine) -> Optional[str]:
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+def is_unversioned(engine: Engine) -> bool:
+    # Databases created by create_all() before there were migrations.
+    inspector = inspect(engine)
+    return inspector.has_table("article") and not inspector.has_table("alembic_version")
+
+def upgrade(engine: Engine, revision: str = "head"):
+    config = alembic_config(engine)
+    if is_unversioned(engine):
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
+
+def load_optional_features(engine: Engine):
+    # The SQLite-only search index and facet summary are used when the
+    # migrations could create them. The typeahead index is read last since
+    # it takes its counts from the facet summary.
+    load_search_index(engine)
+    load_facet_summary(engine)
+    load_prefix_indexes(engine)
+
+def create_schema(engine: Engine):
+    # For new databases in scripts and benchmarks.
+    upgrade(engine)
+    load_optional_features(engine)
+
+def check_schema(engine: Engine):
+    # Startup only compares versions; DDL runs through manage.py upgrade.
+    current, head = current_revision(engine), head_revision()
+    if current != head:
+        raise SchemaVersionError(f"The database schema is at revision {current}, the application needs {head}. "
+                                 f"Run `python manage.py upgrade` first.")
+
+def create_index_online(name: str, table: str, columns: List[str], **kwargs):
+    # PostgreSQL builds the index without blocking writes, which has to run
+    # outside the migration's transaction. SQLite has no online build: the
+    # CREATE INDEX holds the write lock until it finishes.
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True, **kwargs)
+    else:
+        op.create_index(name, table, columns, if_not_exists=True, **kwargs)
+
+def drop_index_online(name: str, table: str):
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table, if_exists=True)
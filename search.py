@@ -0,0 +1,36 @@
+from sqlalchemy import inspect, table, column, literal_column, select, func
+from sqlalchemy.engine import Engine
+from typing import List, Optional
+
+ARTICLE_FTS_TABLE = "article_fts"
+
+MIN_KEYWORD_LENGTH = 3
+
+article_fts = table(ARTICLE_FTS_TABLE, column("rowid"), column("title"), column("abstract"))
+
+search_enabled = False
+
+def load_search_index(engine: Engine):
+    # The index comes from a migration, which skips it when SQLite lacks FTS5
+    # or the trigram tokenizer; keyword filters then use ilike alone.
+    global search_enabled
+    search_enabled = engine.dialect.name == "sqlite" and inspect(engine).has_table(ARTICLE_FTS_TABLE)
+
+def is_searchable(keyword: str) -> bool:
+    # Shorter keywords have no trigram, and LIKE wildcards can't be expressed
+    # in a MATCH query, so those keep using the plain ilike condition only.
+    return len(keyword) >= MIN_KEYWORD_LENGTH and "%" not in keyword and "_" not in keyword
+
+def build_match_query(keywords: List[str]) -> Optional[str]:
+    terms = ['"' + keyword.replace('"', '""') + '"' for keyword in keywords if is_searchable(keyword)]
+    if not search_enabled or not terms:
+        return None
+    return " AND ".join(terms)
+
+def keyword_matches(match_query: str):
+    fts = literal_column(ARTICLE_FTS_TABLE)
+    return select(article_fts.c.rowid.label("article_id"),
+                  func.bm25(fts).label("rank"))\
+                .select_from(article_fts)\
+                .where(fts.op("MATCH")(match_query))\
+                .subquery()
@@ -0,0 +1,143 @@
+# Production entry point: a prefork supervisor around uvicorn workers that
+# share one listening socket. With --preload the application is imported
+# once in the supervisor and the workers are forked from it, so they share
+# the imported code copy-on-write; each worker still runs the lifespan
+# (its own engine pools, schema check and warmup) before it reports ready.
+# Several workers need the shared Redis response cache.
+#
+#   RESPONSE_CACHE_URL=redis://localhost:6379/0 python serve.py --workers 4 --preload
+#
+# main.py keeps the single reloading process for development.
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+import uvicorn
+import lifecycle
+from logs import configure_logging
+
+HOST = os.getenv("HOST", "127.0.0.1")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+PRELOAD_APP = os.getenv("PRELOAD_APP", "0") == "1"
+# A worker that dies sooner than this after it was started is taken to be
+# failing at startup (e.g. an outdated schema), and the supervisor gives up
+# instead of restarting it in a loop.
+MIN_WORKER_UPTIME = float(os.getenv("MIN_WORKER_UPTIME", "10"))
+
+logger = logging.getLogger("app.serve")
+
+def load_app():
+    with lifecycle.timed("import"):
+        from main import app
+    return app
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(app, sock: socket.socket, args):
+    if app is None:
+        app = load_app()
+    config = uvicorn.Config(app, lifespan="on", log_level=args.log_level, proxy_headers=True)
+    uvicorn.Server(config).run(sockets=[sock])
+
+def spawn(app, sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    # Own process group: a Ctrl-C reaches only the supervisor, which then
+    # stops the workers once, gracefully.
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    code = 0
+    try:
+        run_worker(app, sock, args)
+    except SystemExit as exit:
+        # uvicorn exits with 3 when the lifespan startup failed.
+        code = exit.code if isinstance(exit.code, int) else 1
+    except BaseException:
+        logger.exception("worker failed")
+        code = 1
+    finally:
+        os._exit(code)
+
+def supervise(app, sock: socket.socket, args) -> int:
+    workers = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(args.workers):
+        workers[spawn(app, sock, args)] = time.monotonic()
+    code = 0
+    while workers:
+        try:
+            pid, wait_status = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if stopping or started is None:
+            continue
+        exit_code = os.waitstatus_to_exitcode(wait_status)
+        if time.monotonic() - started < MIN_WORKER_UPTIME:
+            logger.error("worker exited during startup, stopping", extra={"pid": pid, "exit_code": exit_code})
+            code = 1
+            stop(signal.SIGTERM, None)
+            continue
+        logger.warning("worker exited, restarting", extra={"pid": pid, "exit_code": exit_code})
+        workers[spawn(app, sock, args)] = time.monotonic()
+    return code
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--preload", action="store_true", default=PRELOAD_APP,
+                        help="Import the application before forking the workers.")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    if args.workers > 1 and not os.getenv("RESPONSE_CACHE_URL"):
+        # Each worker would keep its own in-memory data version: a write in
+        # one would never invalidate the cached responses, ETags and export
+        # files of the others.
+        parser.error("--workers above 1 needs a shared response cache, set RESPONSE_CACHE_URL.")
+    configure_logging()
+
+    if not hasattr(os, "fork"):
+        # No fork on Windows: uvicorn's own spawn based workers, no preload.
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+        return
+    app = load_app() if args.preload or args.workers == 1 else None
+    sock = bind_socket(args.host, args.port)
+    if args.workers == 1:
+        try:
+            run_worker(app, sock, args)
+        except KeyboardInterrupt:
+            # uvicorn re-raises the Ctrl-C it shut down on; uvicorn.run ignores it too.
+            pass
+        return
+    if app is not None:
+        # Objects that exist now are never collected in the workers, so the
+        # collector doesn't write to, and unshare, the preloaded pages.
+        gc.freeze()
+    sys.exit(supervise(app, sock, args))
+
+if __name__ == "__main__":
+    main()
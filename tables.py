@@ -2,16 +2,17 @@ from sqlmodel import SQLModel, Field, Relationship
 from typing import List, Optional
 from datetime import date
 
+# Each link table's primary key serves lookups by its first column, the
+# extra index serves the reverse direction.
 class UserArticleLink(SQLModel, table=True):
     user_id: Optional[int] = Field(default=None, foreign_key="user.id", primary_key=True)
-    article_id: Optional[int] = Field(default=None, foreign_key="article.id", primary_key=True)
+    article_id: Optional[int] = Field(default=None, foreign_key="article.id", primary_key=True, index=True)
 
 class UserCommentLink(SQLModel, table=True):
     user_id: Optional[int] = Field(default=None, foreign_key="user.id", primary_key=True)
-    comment_id: Optional[int] = Field(default=None, foreign_key="comment.id", primary_key=True)
+    comment_id: Optional[int] = Field(default=None, foreign_key="comment.id", primary_key=True, index=True)
 
 class User(SQLModel, table=True):
-    __table_args__ = {'extend_existing': True}
     id: int = Field(default=None, primary_key=True, index=True)
     username: str = Field(default=None, unique=True)
     hashed_password: str
@@ -20,21 +21,23 @@ class User(SQLModel, table=True):
 
 class ArticleAuthorLink(SQLModel, table=True):
     article_id: Optional[int] = Field(default=None, foreign_key="article.id", primary_key=True)
-    author_id: Optional[int] = Field(default=None, foreign_key="author.id", primary_key=True)
+    author_id: Optional[int] = Field(default=None, foreign_key="author.id", primary_key=True, index=True)
 
 class ArticleTagLink(SQLModel, table=True):
     article_id: Optional[int] = Field(default=None, foreign_key="article.id", primary_key=True)
-    tag_id: Optional[int] = Field(default=None, foreign_key="tag.id", primary_key=True)
+    tag_id: Optional[int] = Field(default=None, foreign_key="tag.id", primary_key=True, index=True)
 
 class ArticleCommentLink(SQLModel, table=True):
     article_id: Optional[int] = Field(default=None, foreign_key="article.id", primary_key=True)
-    comment_id: Optional[int] = Field(default=None, foreign_key="comment.id", primary_key=True)
+    comment_id: Optional[int] = Field(default=None, foreign_key="comment.id", primary_key=True, index=True)
 
 class Article(SQLModel, table=True):
     id: int = Field(default=None, primary_key=True)
     title: str
     abstract: str
-    publication_date: Optional[date]
+    publication_date: Optional[date] = Field(default=None, index=True)
+    # Kept up to date by the comment handlers so listings don't count links.
+    comment_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     user: User = Relationship(back_populates="articles", link_model=UserArticleLink)
     authors: List["Author"] = Relationship(back_populates="articles", link_model=ArticleAuthorLink)
     tags: List["Tag"] = Relationship(back_populates="articles", link_model=ArticleTagLink)
@@ -42,12 +45,16 @@ class Article(SQLModel, table=True):
 
 class Author(SQLModel, table=True):
     id: int = Field(default=None, primary_key=True)
-    name: str
+    name: str = Field(index=True)
+    # The normalized name that typeahead prefix searches run on.
+    name_key: str = Field(default="", index=True, sa_column_kwargs={"server_default": ""})
     articles: List[Article] = Relationship(back_populates="authors", link_model=ArticleAuthorLink)
 
 class Tag(SQLModel, table=True):
     id: int = Field(default=None, primary_key=True)
-    name: str
+    name: str = Field(index=True)
+    # The normalized name that typeahead prefix searches run on.
+    name_key: str = Field(default="", index=True, sa_column_kwargs={"server_default": ""})
     articles: List[Article] = Relationship(back_populates="tags", link_model=ArticleTagLink)
 
 class Comment(SQLModel, table=True):
@@ -0,0 +1,86 @@
+import asyncio
+import os
+from datetime import date
+import pytest
+from sqlmodel import Session, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import make_engine, make_async_engine
+from schema import create_schema
+from tables import Article
+from articles import filtered_articles_statement
+import search
+
+TEXTS = [("Deep Learning for Graphs", "Message passing on graphs."),
+         ("A study of deep LEARNING", "Layers all the way down."),
+         ("Café culture in Zürich", "Espresso and CAFÉ society."),
+         ("Straße und Strasse", "Two spellings of one street."),
+         ("naïve Bayes", "NAÏVE approaches still work."),
+         ("100% coverage", "Every line, 50 percent of the time."),
+         ("snake_case names", "a_b testing of identifiers."),
+         ("AI", "ai systems and ml."),
+         ("x", "Short titles."),
+         ("Twin paper", "Identical abstract."),
+         ("Twin paper", "Identical abstract."),
+         ("Twin paper", "Identical abstract.")]
+
+KEYWORDS = ["learning", "LeArNiNg", "deep, learning", "graphs, learning",
+            "café", "CAFÉ", "zürich", "ZÜRICH", "straße", "STRASSE", "naïve", "NAÏVE",
+            "ai", "ML", "x", "ai, learning",
+            "100%", "%", "_", "snake_case", "a_b", "50%", "e_t",
+            "espresso, café", "message", "renamed", "spellings", "twin"]
+
+@pytest.fixture(scope="module")
+def engines(tmp_path_factory):
+    path = os.path.join(tmp_path_factory.mktemp("search"), "search.db")
+    engine = make_engine(f"sqlite:///{path}")
+    create_schema(engine)
+    with Session(engine) as session:
+        for i, (title, abstract) in enumerate(TEXTS):
+            session.add(Article(title=title, abstract=abstract, publication_date=date(2020, 1, 1 + i)))
+        session.commit()
+    async_engine = make_async_engine(f"sqlite+aiosqlite:///{path}")
+    yield engine, async_engine
+    asyncio.run(async_engine.dispose())
+    engine.dispose()
+
+def article_ids(async_engine, keywords: str, rank: bool) -> list:
+    async def run():
+        async with AsyncSession(async_engine) as session:
+            statement = await filtered_articles_statement(None, None, None, None, keywords, session, rank)
+            return [article.id for article in (await session.exec(statement)).all()]
+    return asyncio.run(run())
+
+def assert_same_as_ilike(async_engine, monkeypatch):
+    for keywords in KEYWORDS:
+        for rank in (False, True):
+            monkeypatch.setattr(search, "search_enabled", True)
+            with_index = article_ids(async_engine, keywords, rank)
+            monkeypatch.setattr(search, "search_enabled", False)
+            ilike_only = article_ids(async_engine, keywords, rank)
+            if rank:
+                # Ranked results come in bm25 order, the ilike ones by date.
+                with_index, ilike_only = sorted(with_index), sorted(ilike_only)
+            assert with_index == ilike_only, (keywords, rank)
+
+def test_search_index_is_used(engines):
+    assert search.search_enabled
+
+def test_keywords_match_ilike(engines, monkeypatch):
+    assert_same_as_ilike(engines[1], monkeypatch)
+
+def test_keywords_match_ilike_after_update_and_delete(engines, monkeypatch):
+    engine, async_engine = engines
+    with Session(engine) as session:
+        article = session.exec(select(Article).where(Article.title == "Deep Learning for Graphs")).one()
+        article.title = "Renamed article"
+        article.abstract = "No longer about graphs."
+        session.add(article)
+        session.exec(delete(Article).where(Article.title == "Straße und Strasse"))
+        session.commit()
+    assert_same_as_ilike(async_engine, monkeypatch)
+
+def test_ranked_ties_are_ordered_by_id(engines, monkeypatch):
+    # Equal bm25 scores would otherwise come in no defined order.
+    monkeypatch.setattr(search, "search_enabled", True)
+    ids = article_ids(engines[1], "twin", True)
+    assert len(ids) == 3 and ids == sorted(ids)
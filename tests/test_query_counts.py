@@ -0,0 +1,12 @@
+import pytest
+from benchmarks.query_counts import ENDPOINTS, measure
+
+@pytest.fixture(scope="module")
+def counts():
+    return measure()
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_statements_per_request_are_constant(counts, endpoint):
+    small, large = counts[endpoint]
+    assert large[1] > small[1]
+    assert small[0] == large[0]
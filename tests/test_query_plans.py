@@ -0,0 +1,18 @@
+import pytest
+from benchmarks.query_plans import query_plans, full_scans
+
+@pytest.fixture(scope="module")
+def plans():
+    return query_plans()
+
+def test_no_full_scan(plans):
+    scans = {name: full_scans(name, plan) for name, plan in plans.items()}
+    assert {name: steps for name, steps in scans.items() if steps} == {}
+
+def test_covering_index_scan_is_a_full_scan():
+    assert full_scans("authors", "SCAN author USING COVERING INDEX ix_author_name")
+
+def test_allowed_scans_are_per_query():
+    step = "SCAN article USING INDEX ix_article_publication_date"
+    assert full_scans("month", step) == []
+    assert full_scans("year", step) == [step]
@@ -0,0 +1,133 @@
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import func, and_, cast, String
+from sqlalchemy.engine import Engine
+from threading import Lock
+from tables import Author, Tag, ArticleAuthorLink, ArticleTagLink
+from typing import List, Optional
+import facets
+import bisect
+import heapq
+import os
+import time
+import unicodedata
+
+TYPEAHEAD_PAGE_SIZE = int(os.getenv("TYPEAHEAD_PAGE_SIZE", "20"))
+TYPEAHEAD_MAX_PAGE_SIZE = int(os.getenv("TYPEAHEAD_MAX_PAGE_SIZE", "100"))
+# The in-memory index answers typeahead calls without a query. Names added
+# through add_author and add_tag show up at once; names created by article
+# ingestion, and changed article counts, after the next reload.
+TYPEAHEAD_INDEX = os.getenv("TYPEAHEAD_INDEX", "0") == "1"
+TYPEAHEAD_INDEX_TTL = float(os.getenv("TYPEAHEAD_INDEX_TTL", "300"))
+
+# The model and its link table column per facet_count facet.
+SOURCES = {"authors": (Author, ArticleAuthorLink.author_id),
+           "tags": (Tag, ArticleTagLink.tag_id)}
+
+def normalize_key(name: str) -> str:
+    # Case and compatibility forms folded, whitespace collapsed. Stored in
+    # name_key and applied to the typed prefix alike.
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+def normalize_prefix(prefix: str) -> str:
+    # A trailing space is part of what was typed: "ann " should not match "anna".
+    key = normalize_key(prefix)
+    return key + " " if key and prefix[-1:].isspace() else key
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    # The smallest string greater than every string starting with prefix.
+    while prefix:
+        if ord(prefix[-1]) < 0x10FFFF:
+            return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        prefix = prefix[:-1]
+    return None
+
+def names_statement(facet: str):
+    model, link_column = SOURCES[facet]
+    if facets.summary_enabled:
+        count = func.coalesce(facets.facet_count.c.count, 0)
+        return select(model.id, model.name, model.name_key, count.label("article_count"))\
+                    .outerjoin(facets.facet_count, and_(facets.facet_count.c.facet == facet,
+                                                        facets.facet_count.c.value == cast(model.id, String)))
+    count = func.count(link_column)
+    return select(model.id, model.name, model.name_key, count.label("article_count"))\
+                .outerjoin(link_column.table, link_column == model.id)\
+                .group_by(model.id, model.name, model.name_key)
+
+def typeahead_statement(facet: str, prefix: str, offset: int, limit: int):
+    model, _ = SOURCES[facet]
+    statement = names_statement(facet).where(model.name_key >= prefix)
+    upper = prefix_upper_bound(prefix)
+    if upper is not None:
+        statement = statement.where(model.name_key < upper)
+    return statement\
+                .order_by(statement.selected_columns.article_count.desc(), model.name_key, model.id)\
+                .offset(offset)\
+                .limit(limit)
+
+class PrefixIndex:
+    # Names sorted by key: a prefix is a bisect range, ranked by count.
+    def __init__(self):
+        self.keys = []
+        self.entries = []
+        self.loaded_at = None
+        self.reloading = False
+        self.lock = Lock()
+
+    def load(self, rows):
+        entries = sorted((key, row_id, name, count) for row_id, name, key, count in rows)
+        with self.lock:
+            self.keys = [entry[0] for entry in entries]
+            self.entries = entries
+            self.loaded_at = time.monotonic()
+
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > TYPEAHEAD_INDEX_TTL
+
+    def add(self, row_id: int, name: str, count: int = 0):
+        entry = (normalize_key(name), row_id, name, count)
+        with self.lock:
+            position = bisect.bisect_left(self.entries, entry)
+            self.entries.insert(position, entry)
+            self.keys.insert(position, entry[0])
+
+    def search(self, prefix: str, offset: int, limit: int) -> List[dict]:
+        with self.lock:
+            start = bisect.bisect_left(self.keys, prefix)
+            upper = prefix_upper_bound(prefix)
+            end = bisect.bisect_left(self.keys, upper) if upper is not None else len(self.keys)
+            candidates = self.entries[start:end]
+        ranked = heapq.nsmallest(offset + limit, candidates, key=lambda entry: (-entry[3], entry[0], entry[1]))
+        return [{"id": row_id, "name": name, "article_count": count} for _, row_id, name, count in ranked[offset:]]
+
+indexes = {facet: PrefixIndex() for facet in SOURCES}
+
+def load_prefix_indexes(engine: Engine):
+    if not TYPEAHEAD_INDEX:
+        return
+    with Session(engine) as session:
+        for facet, index in indexes.items():
+            index.load(session.exec(names_statement(facet)).all())
+
+async def reload_index(facet: str, session: AsyncSession):
+    # One request reloads; the others keep answering from the old entries.
+    index = indexes[facet]
+    index.reloading = True
+    try:
+        index.load((await session.exec(names_statement(facet))).all())
+    finally:
+        index.reloading = False
+
+def add_name(facet: str, row_id: int, name: str):
+    if TYPEAHEAD_INDEX and indexes[facet].loaded_at is not None:
+        indexes[facet].add(row_id, name)
+
+async def search_names(facet: str, prefix: str, offset: int, limit: int, session: AsyncSession) -> List[dict]:
+    prefix = normalize_prefix(prefix)
+    if TYPEAHEAD_INDEX:
+        index = indexes[facet]
+        if index.is_stale() and not (index.reloading and index.loaded_at is not None):
+            await reload_index(facet, session)
+        return index.search(prefix, offset, limit)
+    rows = await session.exec(typeahead_statement(facet, prefix, offset, limit))
+    return [{"id": row.id, "name": row.name, "article_count": row.article_count} for row in rows]